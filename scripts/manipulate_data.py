@@ -16,13 +16,15 @@ from pathlib import Path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-from src.utils import setup_logging
-from src.salesforce import SalesforceClient
-from typing import List, Dict, Optional, Tuple, Set
-from bs4 import BeautifulSoup
+from src.utils import setup_logging, chunk_list, load_config, read_csv
+from typing import TYPE_CHECKING, List, Dict, FrozenSet, Optional, Tuple, Set
+from urllib.parse import quote
 import requests
-import yaml
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 import argparse
+import functools
 import time
 import json
 import re
@@ -30,6 +32,125 @@ import os
 from pathlib import Path
 import sys
 
+# lxml and simple_salesforce are only needed once a record is actually
+# processed, so they are imported lazily to keep script startup (and --help) fast
+if TYPE_CHECKING:
+    from lxml.html import HtmlElement
+    from src.salesforce import SalesforceClient
+
+_UA_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+}
+
+# Updateable fields per SObject type, used when the config does not list any
+_DEFAULT_FIELDS = {
+    'Account': frozenset({
+        'Phone', 'Website', 'BillingStreet', 'BillingCity',
+        'BillingState', 'BillingPostalCode', 'BillingCountry'
+    }),
+    'Contact': frozenset({
+        'Phone', 'Email', 'MailingStreet', 'MailingCity',
+        'MailingState', 'MailingPostalCode', 'MailingCountry'
+    }),
+    'Lead': frozenset({
+        'Phone', 'Email', 'Street', 'City',
+        'State', 'PostalCode', 'Country'
+    })
+}
+
+# Enriched data keys mapped to Salesforce fields per SObject type; address
+# maps to (street, city, state, postal code, country) fields
+_FIELD_MAPPINGS = {
+    'Account': {
+        'phone': 'Phone',
+        'website': 'Website',
+        'address': ('BillingStreet', 'BillingCity', 'BillingState',
+                    'BillingPostalCode', 'BillingCountry')
+    },
+    'Contact': {
+        'phone': 'Phone',
+        'email': 'Email',
+        'address': ('MailingStreet', 'MailingCity', 'MailingState',
+                    'MailingPostalCode', 'MailingCountry')
+    },
+    'Lead': {
+        'phone': 'Phone',
+        'email': 'Email',
+        'address': ('Street', 'City', 'State', 'PostalCode', 'Country')
+    }
+}
+
+# Concurrent scraping workers; the session pool is sized to match so every
+# worker can hold a keep-alive connection
+MAX_WORKERS = 16
+
+# Target URLs of Google result links ('url?q=<target>&...'), matched straight
+# on the response bytes; the character class cannot backtrack, so the scan
+# stays linear in the page size
+_RESULT_URL_RE = re.compile(rb'url\?q=(https?://[^&"\'<>\s]+)')
+# Charset declarations lxml honours when it is given the raw page bytes; like
+# browsers, only the start of the document is checked for one
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset', re.IGNORECASE)
+_META_CHARSET_SCAN_BYTES = 4096
+# Result links to these domains are aggregators rather than the company site
+_SKIPPED_RESULT_DOMAINS = (b'google.com', b'youtube.com', b'facebook.com')
+
+# Shared HTTP session so the search and company page fetches reuse pooled
+# keep-alive connections instead of opening a new TLS connection per request
+SESSION = requests.Session()
+_SESSION_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=MAX_WORKERS,
+    max_retries=Retry(total=3, backoff_factor=0.3)
+)
+# Company sites are not always served over TLS, so plain http gets the same pool
+SESSION.mount('https://', _SESSION_ADAPTER)
+SESSION.mount('http://', _SESSION_ADAPTER)
+SESSION.headers.update(_UA_HEADERS)
+
+# Patterns compiled once at import rather than on every extraction call
+# Tried in order: a US/Canada number anywhere in the text beats an international one
+_PHONE_PATTERNS = (
+    re.compile(r'\+?1?\s*\(?[0-9]{3}\)?[-.\s]?[0-9]{3}[-.\s]?[0-9]{4}'),  # US/Canada
+    re.compile(r'\+?[0-9]{1,4}[-.\s]?[0-9]{2,4}[-.\s]?[0-9]{2,4}[-.\s]?[0-9]{2,4}'),  # International
+)
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+_ADDR_RE = re.compile(r'\d+.*(?:street|st|avenue|ave|road|rd|boulevard|blvd)',
+                      re.IGNORECASE)
+_NONDIGIT_RE = re.compile(r'[^\d]')
+# Whitespace left before a comma when an address is split across inline elements
+_SPACE_COMMA_RE = re.compile(r'\s+,')
+# Cheap prefilter: text without a digit cannot hold a phone number
+_DIGIT_RE = re.compile(r'\d')
+# The suite group is lazy so "street, city, ST, zip" is tried before a suite
+# split, and a trailing country is only accepted after a zip code
+_ADDR_PARSE_RE = re.compile(
+    r'^\s*(?P<street>[^,]+?)\s*,\s*(?:(?P<suite>[^,]+?)\s*,\s*)??'
+    r'(?P<city>[^,]+?)\s*,\s*(?P<state>[A-Za-z][^,\d]*?)'
+    r'(?:\s*,?\s*(?P<zip>\d{5}(?:-\d{4})?)'
+    r'(?:\s*,\s*(?P<country>[A-Za-z][^,\d]*?))?)?\s*$'
+)
+_RECORD_ID_RE = re.compile(r'[a-zA-Z0-9]{15,18}')
+
+# Class-name fragments that usually mark an address block, in priority order
+_ADDRESS_INDICATORS = ('address', 'location', 'headquarters', 'contact')
+_ADDRESS_XPATH = '|'.join(
+    f"//{tag}[" + ' or '.join(
+        f"contains(translate(@class, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', "
+        f"'abcdefghijklmnopqrstuvwxyz'), '{indicator}')"
+        for indicator in _ADDRESS_INDICATORS) + "]"
+    for tag in ('div', 'p', 'span')
+)
+# Visible page text, leaving out script and style bodies
+_PAGE_TEXT_XPATH = '//text()[not(ancestor::script or ancestor::style)]'
+# One combined scan per phone pattern; email is tried first so digits in an
+# address's local part are not read as a phone
+_CONTACT_PATTERNS = tuple(
+    re.compile(f'(?P<email>{_EMAIL_RE.pattern})|(?P<phone>{pattern.pattern})')
+    for pattern in _PHONE_PATTERNS
+)
+
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -52,113 +173,161 @@ def parse_args():
         nargs='+',
         help='Specific fields to update (space-separated). If not provided, will use defaults from config.'
     )
+    confirmation = parser.add_mutually_exclusive_group()
+    confirmation.add_argument(
+        '--yes', '-y',
+        action='store_true',
+        help='Apply the update without asking for confirmation'
+    )
+    confirmation.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Show the proposed update without applying it'
+    )
     return parser.parse_args()
 
 
-def load_config(config_path: str) -> Dict:
-    """Load configuration from YAML file."""
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
-    return config
-
-
 def get_default_fields(config: Dict, sobject_type: str) -> Set[str]:
     """Get default updateable fields for the given SObject type."""
-    defaults = {
-        'Account': {
-            'Phone', 'Website', 'BillingStreet', 'BillingCity',
-            'BillingState', 'BillingPostalCode', 'BillingCountry'
-        },
-        'Contact': {
-            'Phone', 'Email', 'MailingStreet', 'MailingCity',
-            'MailingState', 'MailingPostalCode', 'MailingCountry'
-        },
-        'Lead': {
-            'Phone', 'Email', 'Street', 'City',
-            'State', 'PostalCode', 'Country'
-        }
-    }
-
     # Use config if available, otherwise use defaults
-    return set(config.get('enrichment', {}).get('fields', {}).get(sobject_type, defaults.get(sobject_type, set())))
+    configured = config.get('enrichment', {}).get('fields', {})
+    return set(configured.get(sobject_type, _DEFAULT_FIELDS.get(sobject_type, frozenset())))
 
 
 def clean_text(text: str) -> str:
     """Clean and normalize text."""
     if not text:
         return ""
-    return ' '.join(text.strip().split())
+    return ' '.join(text.split())
 
 
 def extract_phone_number(text: str) -> Optional[str]:
     """Extract phone number from text using regex."""
-    patterns = [
-        r'\+?1?\s*\(?[0-9]{3}\)?[-.\s]?[0-9]{3}[-.\s]?[0-9]{4}',  # US/Canada
-        # International
-        r'\+?[0-9]{1,4}[-.\s]?[0-9]{2,4}[-.\s]?[0-9]{2,4}[-.\s]?[0-9]{2,4}'
-    ]
-
-    for pattern in patterns:
-        if match := re.search(pattern, text):
+    if not _DIGIT_RE.search(text):
+        return None
+    for pattern in _PHONE_PATTERNS:
+        if match := pattern.search(text):
             return clean_text(match.group(0))
     return None
 
 
 def extract_email(text: str) -> Optional[str]:
     """Extract email from text using regex."""
-    pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    if match := re.search(pattern, text):
+    if '@' not in text:
+        return None
+    if match := _EMAIL_RE.search(text):
         return match.group(0).lower()
     return None
 
 
-def extract_address(soup: BeautifulSoup) -> Optional[str]:
-    """Extract address from common webpage patterns."""
-    address_indicators = ['address', 'location', 'headquarters', 'contact']
-    for indicator in address_indicators:
-        for element in soup.find_all(['div', 'p', 'span'],
-                                     class_=lambda x: x and indicator in x.lower()):
-            text = clean_text(element.get_text())
-            if re.search(r'\d+.*(?:street|st|avenue|ave|road|rd|boulevard|blvd)',
-                         text, re.IGNORECASE):
-                return text
-    return None
+def extract_contacts(text: str) -> Tuple[Optional[str], Optional[str]]:
+    """Extract the first phone number and email from text.
 
+    The international pattern is only scanned when no US/Canada number is
+    found, matching the priority of extract_phone_number.
+    """
+    phone = email = None
+    if '@' not in text and not _DIGIT_RE.search(text):
+        return phone, email
+    for contact_re in _CONTACT_PATTERNS:
+        for match in contact_re.finditer(text):
+            if match.lastgroup == 'email' and email is None:
+                email = match.group(0).lower()
+            elif match.lastgroup == 'phone' and phone is None:
+                phone = clean_text(match.group(0))
+            if phone and email:
+                break
+        if phone:
+            break
+    return phone, email
 
-def search_company_info(company_name: str) -> Dict:
-    """Search for company information online using web scraping."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-    }
 
-    try:
-        search_query = f"{company_name} company contact"
-        search_url = f"https://www.google.com/search?q={requests.utils.quote(search_query)}"
+@functools.lru_cache(maxsize=None)
+def _xpath(expression: str):
+    """Compile an XPath expression once; lxml is imported on first use."""
+    from lxml import etree
+    return etree.XPath(expression)
 
-        response = requests.get(search_url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
 
-        company_url = None
-        for result in soup.find_all('a'):
-            href = result.get('href', '')
-            if 'url?q=' in href and not any(x in href for x in ['google.com', 'youtube.com', 'facebook.com']):
-                company_url = href.split('url?q=')[1].split('&')[0]
+def extract_address(tree: 'HtmlElement') -> Optional[str]:
+    """Extract address from common webpage patterns."""
+    # A single compiled XPath visits every candidate once; indicator order still
+    # decides which match wins, so an 'address' element beats a 'contact' one
+    best_match, best_rank = None, len(_ADDRESS_INDICATORS)
+    for element in _xpath(_ADDRESS_XPATH)(tree):
+        classes = (element.get('class') or '').lower()
+        rank = next((i for i, indicator in enumerate(_ADDRESS_INDICATORS)
+                     if indicator in classes), best_rank)
+        if rank >= best_rank:
+            continue
+        # Text nodes are space-joined so <br>-separated lines stay apart, which
+        # leaves "Street , City" wherever a span ends right before a comma
+        text = _SPACE_COMMA_RE.sub(',', clean_text(' '.join(element.itertext())))
+        if _ADDR_RE.search(text):
+            best_match, best_rank = text, rank
+            if rank == 0:
                 break
+    return best_match
 
-        if not company_url:
-            raise ValueError("Could not find company website")
 
-        response = requests.get(company_url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        text_content = soup.get_text()
+def _page_encoding(response: requests.Response) -> Optional[str]:
+    """
+    Pick the charset to decode a company page with, or None to let lxml read
+    the page's own <meta charset>. requests reports ISO-8859-1 for any text/html
+    response without a charset parameter, so its encoding is only trusted when
+    the Content-Type header actually declares one.
+    """
+    if 'charset=' in response.headers.get('Content-Type', '').lower():
+        return response.encoding
+    if _META_CHARSET_RE.search(response.content, 0, _META_CHARSET_SCAN_BYTES):
+        return None
+    return response.apparent_encoding
 
-        return {
-            'phone': extract_phone_number(text_content) or '',
-            'email': extract_email(text_content) or '',
-            'address': extract_address(soup) or '',
-            'website': company_url
-        }
 
+@functools.lru_cache(maxsize=1024)
+def _lookup_company(company_name: str) -> Tuple[Tuple[str, str], ...]:
+    """
+    Scrape contact details for a normalised company name.
+    Results are returned as hashable items and memoised; failures raise, so
+    they are not cached and the company is retried on the next lookup.
+    """
+    from lxml import html
+
+    search_query = f"{company_name} company contact"
+    search_url = f"https://www.google.com/search?q={quote(search_query)}"
+
+    # Only the first result link is needed from the search page, so scan the
+    # raw HTML for it instead of parsing the page into a tree
+    response = SESSION.get(search_url, timeout=10)
+    company_url = next(
+        (match.group(1).decode() for match in _RESULT_URL_RE.finditer(response.content)
+         if not any(domain in match.group(1) for domain in _SKIPPED_RESULT_DOMAINS)),
+        None)
+    if not company_url:
+        raise ValueError("Could not find company website")
+
+    response = SESSION.get(company_url, timeout=10)
+    encoding = _page_encoding(response)
+    parser = html.HTMLParser(encoding=encoding) if encoding else None
+    tree = html.fromstring(response.content, parser=parser)
+    # Build the page text once, separating text nodes so words in
+    # adjacent elements are not glued together
+    page_text = ' '.join(filter(None, (t.strip() for t in _xpath(_PAGE_TEXT_XPATH)(tree))))
+    phone, email = extract_contacts(page_text)
+
+    return (
+        ('phone', phone or ''),
+        ('email', email or ''),
+        ('address', extract_address(tree) or ''),
+        ('website', company_url)
+    )
+
+
+def search_company_info(company_name: str) -> Dict:
+    """Search for company information online using web scraping."""
+    try:
+        # Names differing only in case or spacing share one cached lookup
+        return dict(_lookup_company(' '.join(company_name.split()).lower()))
     except Exception as e:
         print(f"Warning: Error during web scraping: {str(e)}")
         return {
@@ -169,17 +338,50 @@ def search_company_info(company_name: str) -> Dict:
         }
 
 
-def get_salesforce_record(sf_client: SalesforceClient, record_id: str,
-                          sobject_type: str, fields: Set[str]) -> Optional[Dict]:
-    """Query Salesforce for a record by ID."""
+def enrich_many(company_names: List[str], max_workers: int = MAX_WORKERS) -> List[Dict]:
+    """
+    Search for information on several companies concurrently.
+    Results are returned in the same order as company_names. Requests are
+    I/O-bound, so worker threads overlap their network waits while sharing
+    the pooled SESSION; max_workers caps the number of requests in flight.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(search_company_info, company_names))
+
+
+@functools.lru_cache(maxsize=16)
+def _select_clause(sobject_type: str, fields: FrozenSet[str]) -> str:
+    """Build the SOQL SELECT ... FROM clause once per object and field set."""
     # Always include Id and Name fields
-    query_fields = list(fields | {'Id', 'Name'})
+    query_fields = sorted(fields | {'Id', 'Name'})
+    return f"SELECT {', '.join(query_fields)} FROM {sobject_type}"
+
+
+def _validate_record_id(record_id: str) -> None:
+    """Reject anything but plain 15/18 character IDs so they are safe to interpolate."""
+    if not _RECORD_ID_RE.fullmatch(record_id):
+        raise ValueError(f"Invalid Salesforce record ID: '{record_id}'")
+
 
-    soql = f"""
-        SELECT {', '.join(query_fields)}
-        FROM {sobject_type}
-        WHERE Id = '{record_id}'
+def enrich_csv(csv_path: str, config_path: str = 'config/config.yaml',
+               max_workers: int = MAX_WORKERS) -> List[Dict]:
     """
+    Enrich every row of a CSV file using its 'Name' column as the company name.
+    The scraped phone, email, address and website values are merged into each
+    row dict in place, and the rows are returned.
+    """
+    rows = list(read_csv(csv_path, config_path))
+    results = enrich_many([row['Name'] for row in rows], max_workers)
+    for row, enriched_data in zip(rows, results):
+        row.update(enriched_data)
+    return rows
+
+
+def get_salesforce_record(sf_client: 'SalesforceClient', record_id: str,
+                          sobject_type: str, fields: Set[str]) -> Optional[Dict]:
+    """Query Salesforce for a record by ID."""
+    _validate_record_id(record_id)
+    soql = f"{_select_clause(sobject_type, frozenset(fields))} WHERE Id = '{record_id}'"
 
     try:
         results = sf_client.query(soql)
@@ -189,33 +391,41 @@ def get_salesforce_record(sf_client: SalesforceClient, record_id: str,
         return None
 
 
+def get_salesforce_records(sf_client: 'SalesforceClient', record_ids: List[str],
+                           sobject_type: str, fields: Set[str],
+                           chunk_size: int = 200) -> Dict[str, Dict]:
+    """
+    Query Salesforce for many records by ID using one IN-clause query per chunk.
+    Returns a dictionary of { record_id: record }; IDs that were malformed,
+    not found, or whose chunk failed to query are absent from the result.
+    """
+    valid_ids = []
+    for record_id in record_ids:
+        try:
+            _validate_record_id(record_id)
+        except ValueError as e:
+            print(f"Skipping record: {str(e)}")
+            continue
+        valid_ids.append(record_id)
+    select = _select_clause(sobject_type, frozenset(fields))
+
+    records = {}
+    for chunk in chunk_list(valid_ids, chunk_size):
+        id_list = ', '.join(f"'{record_id}'" for record_id in chunk)
+        try:
+            for record in sf_client.query(f"{select} WHERE Id IN ({id_list})"):
+                records[record['Id']] = record
+        except Exception as e:
+            print(f"Error querying Salesforce: {str(e)}")
+    return records
+
+
 def prepare_record_update(record_id: str, enriched_data: Dict,
                           sobject_type: str, fields: Set[str]) -> Dict:
     """Prepare the record data for Salesforce update based on object type."""
     update_data = {'Id': record_id}
 
-    # Map enriched data to Salesforce fields based on object type
-    field_mappings = {
-        'Account': {
-            'phone': 'Phone',
-            'website': 'Website',
-            'address': ['BillingStreet', 'BillingCity', 'BillingState',
-                        'BillingPostalCode', 'BillingCountry']
-        },
-        'Contact': {
-            'phone': 'Phone',
-            'email': 'Email',
-            'address': ['MailingStreet', 'MailingCity', 'MailingState',
-                        'MailingPostalCode', 'MailingCountry']
-        },
-        'Lead': {
-            'phone': 'Phone',
-            'email': 'Email',
-            'address': ['Street', 'City', 'State', 'PostalCode', 'Country']
-        }
-    }
-
-    mapping = field_mappings.get(sobject_type, {})
+    mapping = _FIELD_MAPPINGS.get(sobject_type, {})
 
     # Add simple field mappings if they're in the fields to update
     for source, target in mapping.items():
@@ -223,26 +433,20 @@ def prepare_record_update(record_id: str, enriched_data: Dict,
             update_data[target] = enriched_data[source]
 
     # Handle address fields if any are in the fields to update
-    if isinstance(mapping.get('address'), list):
+    if isinstance(mapping.get('address'), tuple):
         address = enriched_data.get('address', '')
         if address:
-            # Split address into parts and clean up
-            parts = [p.strip() for p in address.split(',')]
-
-            # Handle different address formats
-            if len(parts) >= 4:  # Full address with suite/unit
-                street_parts = parts[0:2]  # Include both street and suite
-                city = parts[-3].strip()
-                state = parts[-2].strip()
-                postal = parts[-1].strip()
-            elif len(parts) == 3:  # Basic address format
-                street_parts = [parts[0]]
-                city = parts[1].strip()
-                state = parts[2].strip()
-                postal = ''
-            else:
+            # Tokenise "street[, suite], city, state[,] [zip]" in one regex pass
+            match = _ADDR_PARSE_RE.match(address)
+            if not match:
                 return update_data  # Invalid address format
 
+            street_parts = [p for p in match.group('street', 'suite') if p]
+            city = match.group('city')
+            state = match.group('state')
+            postal = match.group('zip') or ''
+            country = match.group('country') or 'United States'
+
             address_fields = mapping['address']
             if address_fields[0] in fields:  # Street
                 update_data[address_fields[0]] = ', '.join(street_parts)
@@ -251,14 +455,14 @@ def prepare_record_update(record_id: str, enriched_data: Dict,
             if address_fields[2] in fields:  # State
                 update_data[address_fields[2]] = state
             if address_fields[3] in fields and postal:  # PostalCode
-                update_data[address_fields[3]] = re.sub(r'[^\d]', '', postal)
+                update_data[address_fields[3]] = _NONDIGIT_RE.sub('', postal)
             if address_fields[4] in fields:  # Country
-                update_data[address_fields[4]] = 'United States'
+                update_data[address_fields[4]] = country
 
     return update_data
 
 
-def update_salesforce_record(sf_client: SalesforceClient, update_data: Dict,
+def update_salesforce_record(sf_client: 'SalesforceClient', update_data: Dict,
                              sobject_type: str) -> bool:
     """Update the record in Salesforce."""
     try:
@@ -270,6 +474,35 @@ def update_salesforce_record(sf_client: SalesforceClient, update_data: Dict,
         return False
 
 
+def update_salesforce_records(sf_client: 'SalesforceClient', update_rows: List[Dict],
+                              sobject_type: str) -> bool:
+    """
+    Update many records in Salesforce, returning True only if every row succeeded.
+    SalesforceClient.bulk_update picks SObject Collections or the Bulk API
+    based on the api.composite_threshold setting.
+    """
+    try:
+        results = sf_client.bulk_update(sobject_type, update_rows)
+    except Exception as e:
+        print(f"Error updating Salesforce: {str(e)}")
+        return False
+
+    success = True
+    for result in results:
+        if not result.get('success', False):
+            success = False
+            errors = '; '.join(e.get('message', '') for e in result.get('errors', []))
+            print(f"Error updating Salesforce record {result.get('id')}: {errors}")
+    return success
+
+
+def format_json(data: Dict) -> str:
+    """Pretty-print a record as indented JSON for display."""
+    # A one-record preview is too small for orjson to pay off, and the stdlib
+    # escapes non-ASCII characters the way existing output expects
+    return json.dumps(data, indent=2)
+
+
 def get_user_confirmation() -> bool:
     """Get user confirmation for the update."""
     while True:
@@ -289,6 +522,7 @@ def main():
 
     try:
         # Initialize Salesforce client
+        from src.salesforce import SalesforceClient
         sf_client = SalesforceClient(args.config)
 
         # Get fields to update (from args or config)
@@ -316,12 +550,14 @@ def main():
         # Step 4: Show what would be updated
         logger.info("The following updates would be made to Salesforce:")
         print("\nCurrent Salesforce Data:")
-        print(json.dumps(record, indent=2))
+        print(format_json(record))
         print("\nProposed Updates:")
-        print(json.dumps(update_data, indent=2))
+        print(format_json(update_data))
 
-        # Step 5: Get user confirmation and update
-        if get_user_confirmation():
+        # Step 5: Get user confirmation (unless running headless) and update
+        if args.dry_run:
+            logger.info("Dry run - no changes were made")
+        elif args.yes or get_user_confirmation():
             logger.info(f"Updating {args.sobject_type}...")
             if update_salesforce_record(sf_client, update_data, args.sobject_type):
                 logger.info(f"Successfully updated {args.sobject_type}!")
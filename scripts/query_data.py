@@ -6,7 +6,8 @@ import os
 import sys
 import csv
 import argparse
-from typing import List, Dict
+from itertools import chain
+from typing import Dict, Iterable
 
 # Add the project root directory to the Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -27,26 +28,35 @@ def parse_args():
     return parser.parse_args()
 
 
-def save_to_csv(records: List[Dict], output_file: str, config_path: str) -> None:
-    """Save query results to CSV file."""
-    if not records:
-        return
+def save_to_csv(records: Iterable[Dict], output_file: str, logger) -> int:
+    """
+    Stream query results to a CSV file and return the number of rows written.
+    Records are written one at a time so the full result set is never held in memory.
+    """
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return 0
 
     # Create output directory if it does not exist
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
     # Get field names from first record
-    fieldnames = list(records[0].keys())
+    fieldnames = list(first.keys())
 
-    logger = setup_logging(config_path)
+    count = 0
     try:
-        with open(output_file, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(records)
+        with open(output_file, 'w', newline='', buffering=1 << 20) as f:
+            # Plain csv.writer rows avoid DictWriter's per-row field lookups
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
+            for record in chain([first], records):
+                writer.writerow([record.get(field, '') for field in fieldnames])
+                count += 1
     except Exception as e:
         logger.error(f"Error saving to CSV file {output_file}: {str(e)}")
         raise
+    return count
 
 
 def main():
@@ -59,13 +69,10 @@ def main():
         sf = SalesforceClient(args.config)
         logger.info(f"Initialised connection to Salesforce. Session ID is {sf.sf.session_id}")
 
-        # Execute query
+        # Execute query, streaming each page of results straight to CSV
         logger.info(f"Executing query: {args.soql}")
-        records = sf.query(args.soql)
-        logger.info(f"Retrieved {len(records)} records")
-
-        # Save results to CSV
-        save_to_csv(records, args.output_file, args.config)
+        count = save_to_csv(sf.query_iter(args.soql), args.output_file, logger)
+        logger.info(f"Retrieved {count} records")
         logger.info(f"Results saved to {args.output_file}")
 
     except Exception as e:
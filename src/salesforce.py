@@ -2,12 +2,23 @@
 Salesforce connection and operations module.
 """
 import os
-from typing import Dict, List, Optional
-import yaml
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from simple_salesforce import Salesforce
 from simple_salesforce.exceptions import SalesforceError
-
+from src.utils import (
+    build_sobject_collection_payload,
+    chunk_list,
+    json_dumps,
+    json_loads,
+    load_config
+)
 
 class SalesforceClient:
     """Handles Salesforce authentication and operations."""
@@ -17,12 +28,38 @@ class SalesforceClient:
         load_dotenv()
 
         # Load configuration
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+        self.config = load_config(config_path)
+
+        # Object describe results, keyed by object name: (description, fetched_at)
+        self._describe_cache: Dict[str, Tuple[Dict, float]] = {}
+        self._describe_refreshing = set()
+        self._describe_lock = threading.Lock()
 
         # Initialise Salesforce connection
         self.sf = self._authenticate()
 
+    def _build_session(self) -> requests.Session:
+        """
+        Build an HTTP session whose connection pool is large enough for
+        concurrent batch uploads and which retries transient gateway errors.
+        """
+        api_config = self.config['api']
+        # With pool_block=True a pool smaller than the worker count would stall
+        # uploads, so never size it below max_concurrency
+        adapter = HTTPAdapter(
+            pool_maxsize=max(api_config.get('max_concurrency', 5),
+                             api_config.get('pool_maxsize', 25)),
+            pool_block=True,
+            # raise_on_status=False hands the last error response back, so
+            # simple_salesforce still maps it to a SalesforceError
+            max_retries=Retry(total=5, backoff_factor=0.5,
+                              status_forcelist=[502, 503, 504],
+                              raise_on_status=False)
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        return session
+
     def _authenticate(self) -> Salesforce:
         """Authenticate with Salesforce using environment variables."""
         try:
@@ -31,10 +68,11 @@ class SalesforceClient:
                 password=os.getenv('SALESFORCE_PASSWORD'),
                 security_token=os.getenv('SALESFORCE_SECURITY_TOKEN', ''),
                 domain=os.getenv('SALESFORCE_DOMAIN', 'login'),
-                version=self.config['api']['version']
+                version=self.config['api']['version'],
+                session=self._build_session()
             )
         except Exception as e:
-            raise ConnectionError(f"Failed to connect to Salesforce: {str(e)}")
+            raise ConnectionError(f"Failed to connect to Salesforce: {str(e)}") from e
 
     def query(self, soql: str) -> List[Dict]:
         """Execute a SOQL query and return results."""
@@ -42,27 +80,132 @@ class SalesforceClient:
             results = self.sf.query(soql)
             return results['records']
         except SalesforceError as e:
-            raise Exception(f"Query failed: {e.message}")
+            raise Exception(f"Query failed: {e.message}") from e
+
+    def query_iter(self, soql: str) -> Iterator[Dict]:
+        """Execute a SOQL query and yield results, fetching pages lazily."""
+        try:
+            yield from self.sf.query_all_iter(soql)
+        except SalesforceError as e:
+            raise Exception(f"Query failed: {e.message}") from e
+
+    def _collection_request(self, object_name: str, data: List[Dict],
+                            operation: str) -> List[Dict]:
+        """Send records through the SObject Collections endpoint, 200 per call."""
+        results = []
+        for chunk in chunk_list(data, 200):
+            endpoint, method, payload = build_sobject_collection_payload(
+                chunk, object_name, operation)
+            results.extend(self.rest_call(endpoint, method, json_dumps(payload)))
+        return results
+
+    def rest_call(self, endpoint: str, method: str, data=None):
+        """
+        Call a REST endpoint such as composite/sobjects and return the decoded JSON response.
+        Unlike sf.restful, the raw body is decoded with orjson rather than into OrderedDicts.
+        """
+        # _call_salesforce still refreshes expired sessions and raises SalesforceError
+        result = self.sf._call_salesforce(method, self.sf.base_url + endpoint,
+                                          name=endpoint, data=data)
+        return json_loads(result.content) if result.content else None
+
+    def composite_request(self, subrequests: List[Dict], all_or_none: bool = False) -> List[Dict]:
+        """
+        Send up to 25 subrequests in one Composite API call and return their responses.
+        Each url is relative to the versioned data endpoint (e.g. 'sobjects/Case/500...')
+        and may reference an earlier subrequest's result, e.g. '@{newCase.id}'.
+        """
+        prefix = f"/services/data/v{self.config['api']['version']}/"
+        payload = {
+            'allOrNone': all_or_none,
+            'compositeRequest': [{**r, 'url': prefix + r['url']} for r in subrequests]
+        }
+        return self.rest_call('composite', 'POST', json_dumps(payload))['compositeResponse']
+
+    def _use_collections(self, data: List[Dict]) -> bool:
+        """Small loads skip the bulk job queue and use synchronous collection calls."""
+        return len(data) <= self.config['api'].get('composite_threshold', 2000)
 
     def bulk_insert(self, object_name: str, data: List[Dict]) -> List[Dict]:
-        """Insert multiple records using bulk API."""
+        """Insert multiple records, using SObject Collections for small loads and bulk API otherwise."""
         try:
+            if self._use_collections(data):
+                return self._collection_request(object_name, data, 'insert')
             results = self.sf.bulk.__getattr__(object_name).insert(data)
             return results
         except SalesforceError as e:
-            raise Exception(f"Bulk insert failed: {e.message}")
+            raise Exception(f"Bulk insert failed: {e.message}") from e
 
     def bulk_update(self, object_name: str, data: List[Dict]) -> List[Dict]:
-        """Update multiple records using bulk API."""
+        """Update multiple records, using SObject Collections for small loads and bulk API otherwise."""
         try:
+            if self._use_collections(data):
+                return self._collection_request(object_name, data, 'update')
             results = self.sf.bulk.__getattr__(object_name).update(data)
             return results
         except SalesforceError as e:
-            raise Exception(f"Bulk update failed: {e.message}")
+            raise Exception(f"Bulk update failed: {e.message}") from e
 
     def get_object_fields(self, object_name: str) -> Dict:
-        """Get field descriptions for a Salesforce object."""
+        """
+        Get field descriptions for a Salesforce object.
+        Results are cached in memory and, if api.describe_cache_dir is set, on
+        disk. Entries older than api.describe_cache_ttl are returned as-is while
+        a background thread refreshes them, so stale data is served rather than
+        blocking on (or failing with) a slow describe call.
+        """
+        entry = self._describe_cache.get(object_name) or self._read_describe_file(object_name)
+        if entry is None:
+            return self._refresh_object_fields(object_name)
+
+        description, fetched_at = entry
+        self._describe_cache[object_name] = entry
+        if time.time() - fetched_at > self.config['api'].get('describe_cache_ttl', 86400):
+            with self._describe_lock:
+                if object_name not in self._describe_refreshing:
+                    self._describe_refreshing.add(object_name)
+                    threading.Thread(target=self._background_refresh,
+                                     args=(object_name,), daemon=True).start()
+        return description
+
+    def _refresh_object_fields(self, object_name: str) -> Dict:
+        """Fetch an object description from Salesforce and update the caches."""
         try:
-            return self.sf.__getattr__(object_name).describe()
+            description = self.sf.__getattr__(object_name).describe()
         except SalesforceError as e:
-            raise Exception(f"Failed to get object description: {e.message}")
\ No newline at end of file
+            raise Exception(f"Failed to get object description: {e.message}") from e
+
+        fetched_at = time.time()
+        self._describe_cache[object_name] = (description, fetched_at)
+        cache_file = self._describe_cache_file(object_name)
+        if cache_file is not None:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            cache_file.write_bytes(json_dumps(description))
+        return description
+
+    def _background_refresh(self, object_name: str) -> None:
+        """Refresh a stale description, keeping the stale copy if the refresh fails."""
+        try:
+            self._refresh_object_fields(object_name)
+        except Exception:
+            pass
+        finally:
+            with self._describe_lock:
+                self._describe_refreshing.discard(object_name)
+
+    def _describe_cache_file(self, object_name: str) -> Optional[Path]:
+        """Path of the on-disk describe cache for this org, or None if disabled."""
+        cache_dir = self.config['api'].get('describe_cache_dir')
+        if not cache_dir:
+            return None
+        return Path(cache_dir).expanduser() / self.sf.sf_instance / f"{object_name}.json"
+
+    def _read_describe_file(self, object_name: str) -> Optional[Tuple[Dict, float]]:
+        """Load a cached description and its age from disk, if present."""
+        cache_file = self._describe_cache_file(object_name)
+        if cache_file is None:
+            return None
+        try:
+            return json_loads(cache_file.read_bytes()), cache_file.stat().st_mtime
+        except (OSError, ValueError):
+            return None
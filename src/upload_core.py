@@ -0,0 +1,356 @@
+"""
+Core implementation of the CSV upload to Salesforce, shared by the upload scripts:
+- insert, update, delete, upsert
+- batch size of up to 200 records per call to the normal API (SObject Collections)
+- interactive field mapping with the option to skip fields
+"""
+import csv
+import os
+import random
+import sys
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import chain
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Sized
+
+import requests
+
+from src.utils import (
+    setup_logging,
+    read_csv,
+    save_failed_records,
+    chunk_list,
+    build_sobject_collection_payload,
+    json_dumps
+)
+
+# simple_salesforce is only needed once an upload actually runs, so the client
+# is imported lazily inside run() to keep script startup (and --help) fast
+if TYPE_CHECKING:
+    from src.salesforce import SalesforceClient
+
+
+# Per-record upload outcomes; tuples are much cheaper to allocate than dicts
+# when aggregating hundreds of thousands of results
+SuccessResult = namedtuple('SuccessResult', 'record id')
+FailureResult = namedtuple('FailureResult', 'record error')
+
+# Retry policy for transient failures of a single collection request
+_RETRY_ATTEMPTS = 5
+_RETRY_INITIAL_DELAY = 0.5
+_RETRY_MAX_DELAY = 30
+# Salesforce refuses the whole request with these, so nothing was applied
+_RETRY_STATUSES = frozenset({429, 503})
+
+
+def prompt_field_mapping(records: List[Dict], logger) -> Dict[str, str]:
+    """
+    Prompt the user to map CSV fields to Salesforce fields.
+    Returns a dictionary of { original_field_name: new_field_name }.
+    If a field is skipped, it won't appear in this dictionary at all.
+    """
+    if not records:
+        logger.warning("No records found in CSV; skipping field mapping.")
+        return {}
+
+    fieldnames = list(records[0].keys())
+    field_mapping = {}
+
+    logger.info("Starting interactive field mapping...")
+
+    for field in fieldnames:
+        print(f"\nField detected: '{field}'")
+        response = input(
+            "Map this field to Salesforce? (y to map, n to skip): ").strip().lower()
+
+        # If user chooses to skip the field entirely, do not include it in field_mapping
+        if response == "n":
+            logger.info(f"Skipping field '{field}'. It will not be uploaded.")
+            continue
+
+        # Otherwise, user wants to map
+        new_name = input(
+            f"Enter the Salesforce field name to map '{field}' to.\n"
+            f"(Press Enter to keep '{field}'): "
+        ).strip()
+
+        # If new_name is empty, keep original
+        if not new_name:
+            new_name = field
+
+        field_mapping[field] = new_name
+        logger.info(
+            f"Mapping CSV field '{field}' -> Salesforce field '{new_name}'.")
+    return field_mapping
+
+
+def apply_field_mapping(records: Iterable[Dict], field_mapping: Dict[str, str]) -> Iterator[Dict]:
+    """
+    Lazily yield new records that apply the given field mapping.
+    Skips fields not in field_mapping at all.
+    """
+    pairs = list(field_mapping.items())
+    for record in records:
+        # Rows from csv.DictReader all carry every header, so the plain
+        # comprehension almost always succeeds; fall back for sparse records
+        try:
+            new_record = {mapped: record[original] for original, mapped in pairs}
+        except KeyError:
+            new_record = {mapped: record[original] for original, mapped in pairs
+                          if original in record}
+        yield new_record
+
+
+def _is_retryable(error: Exception, operation: str) -> bool:
+    """
+    Decide whether a failed collection request can safely be sent again.
+    Throttling and Server Busy responses were never applied. A dropped connection
+    may have been, so it is only replayed for operations that are idempotent
+    (update, delete, and upsert on an external ID), never for plain inserts.
+    """
+    if getattr(error, 'status', None) in _RETRY_STATUSES:
+        return True
+    if isinstance(error, (requests.exceptions.ConnectionError, ConnectionError)):
+        return operation != "insert"
+    return False
+
+
+def _rest_call_with_retry(sf, endpoint: str, method: str, data, operation: str, logger):
+    """Call a REST endpoint, retrying transient failures with exponential backoff and jitter."""
+    for attempt in range(1, _RETRY_ATTEMPTS + 1):
+        try:
+            return sf.rest_call(endpoint, method, data)
+        except Exception as e:
+            if attempt == _RETRY_ATTEMPTS or not _is_retryable(e, operation):
+                raise
+            delay = min(_RETRY_MAX_DELAY, _RETRY_INITIAL_DELAY * 2 ** (attempt - 1))
+            delay += random.uniform(0, delay)
+            logger.warning(f"Transient error on attempt {attempt}/{_RETRY_ATTEMPTS}, "
+                           f"retrying in {delay:.1f}s: {str(e)}")
+            time.sleep(delay)
+
+
+def send_sobject_collection_request(sf, endpoint: str, method: str, payload, operation: str, logger):
+    """
+    Make a single call to the SObject Collections endpoint, e.g.
+    POST /services/data/vXX.X/composite/sobjects
+    The endpoint, method and payload come from build_sobject_collection_payload;
+    operation is only used to decide whether a failed call may be retried.
+    Return the raw result or raise an exception if the call fails at the HTTP level.
+
+    The result is typically a list of results, e.g.:
+    [
+      {
+        "id": "001...",
+        "success": true,
+        "errors": []
+      },
+      ...
+    ]
+    We'll parse it in the calling function.
+    """
+    try:
+        return _rest_call_with_retry(
+            sf,
+            endpoint,
+            method,
+            json_dumps(payload) if payload is not None else None,
+            operation,
+            logger
+        )
+    except Exception as e:
+        logger.error(f"SObject Collection API request failed: {str(e)}")
+        raise
+
+
+def perform_operation_in_batches(
+    object_name: str,
+    operation: str,
+    records: Iterable[Dict],
+    sf: 'SalesforceClient',
+    external_id_field: str,
+    batch_size: int,
+    logger,
+    max_concurrency: int = 5
+):
+    """
+    Chunk the records by batch_size and perform the given operation using
+    the SObject Collections endpoint (up to 200 records per batch).
+    Up to max_concurrency batches are in flight at once; results are still
+    collected in batch order.
+    Returns (successes, failures) as lists of SuccessResult(record, id)
+    and FailureResult(record, error) respectively.
+    If a batch request fails outright, batches not yet started are cancelled,
+    those already sent are waited for, and the exception is re-raised with the
+    results gathered so far attached as its partial_results attribute.
+    """
+    all_successes = []
+    all_failures = []
+    succ_append = all_successes.append
+    fail_append = all_failures.append
+
+    # Salesforce rejects a batch that names the same record twice, so repeated
+    # keys are collapsed within each chunk, keeping the last occurrence
+    dedupe_key = "Id" if operation in ("update", "delete") else (
+        external_id_field if operation == "upsert" else None)
+
+    def dedupe(chunk_idx, chunk):
+        try:
+            unique = list({r[dedupe_key]: r for r in chunk}.values())
+        except KeyError:
+            # Leave it to the payload builder to report the missing key
+            return chunk
+        if len(unique) < len(chunk):
+            logger.warning(f"Dropped {len(chunk) - len(unique)} duplicate {dedupe_key} "
+                           f"values from chunk {chunk_idx}")
+        return unique
+
+    # The chunk total is only known up front when records is a sized collection;
+    # streamed input (e.g. from read_csv) logs a running record count instead
+    total_chunks = -(-len(records) // batch_size) if isinstance(records, Sized) else None
+
+    def send_chunk(chunk_idx, chunk, records_read):
+        if dedupe_key:
+            chunk = dedupe(chunk_idx, chunk)
+        if total_chunks is not None:
+            progress = f"chunk {chunk_idx}/{total_chunks}"
+        else:
+            progress = f"chunk {chunk_idx} ({records_read} records read so far)"
+        logger.info(f"Processing {progress} with {len(chunk)} records (operation = {operation})")
+        endpoint, method, payload = build_sobject_collection_payload(
+            chunk, object_name, operation, external_id_field)
+        return chunk, send_sobject_collection_request(sf, endpoint, method, payload, operation, logger)
+
+    def collect(chunk, result):
+        result_records = result.get("results", []) if isinstance(result, dict) else result
+        if len(result_records) != len(chunk):
+            logger.warning("Response count does not match request count - check API behavior")
+        for original, response in zip(chunk, result_records):
+            if response["success"]:
+                succ_append(SuccessResult(original, response.get("id")))
+            else:
+                fail_append(FailureResult(original, "; ".join(
+                    e["message"] for e in response.get("errors", ()))))
+
+    # HTTP calls are I/O-bound, so worker threads overlap their round trips.
+    # Only max_concurrency batches are queued at a time to respect Salesforce's
+    # concurrent request limits and keep memory bounded.
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        pending = deque()
+        records_read = 0
+        try:
+            for chunk_idx, chunk in enumerate(chunk_list(records, batch_size), start=1):
+                records_read += len(chunk)
+                pending.append(executor.submit(send_chunk, chunk_idx, chunk, records_read))
+                if len(pending) >= max_concurrency:
+                    collect(*pending.popleft().result())
+            while pending:
+                collect(*pending.popleft().result())
+        except Exception as e:
+            # Batches already sent may have been applied by Salesforce, so wait
+            # for them and keep their outcomes; queued ones are never sent
+            for future in pending:
+                future.cancel()
+            for future in pending:
+                if future.cancelled():
+                    continue
+                try:
+                    collect(*future.result())
+                except Exception:
+                    pass  # Already logged by send_sobject_collection_request
+            logger.error(f"Stopped after a failed batch; {len(all_successes)} records succeeded "
+                         f"and {len(all_failures)} failed before the error")
+            e.partial_results = (all_successes, all_failures)
+            raise
+    return all_successes, all_failures
+
+
+def save_upload_results(successes: List[SuccessResult], failures: List[FailureResult], csv_file: str, logger) -> None:
+    """
+    Save record-by-record playback of upload results to CSV files.
+    Creates two files: one for successes and one for failures, in a 'results' directory.
+    Each record includes original input fields and additional columns indicating the result.
+    """
+    results_dir = os.path.join(os.getcwd(), "results")
+    os.makedirs(results_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    success_filename = os.path.join(results_dir, f"upload_success_{timestamp}.csv")
+    error_filename = os.path.join(results_dir, f"upload_errors_{timestamp}.csv")
+
+    _write_results(success_filename, successes, "Success", "SalesforceId")
+    _write_results(error_filename, failures, "Error", "Error")
+
+    logger.info(f"Success records saved to: {success_filename}")
+    logger.info(f"Error records saved to: {error_filename}")
+
+
+def _write_results(filename: str, items: List[tuple], result: str, column: str) -> None:
+    """
+    Write one results file: the original record fields followed by Result and the given
+    column, filled from each result's second field (the Salesforce Id or the error).
+    Rows are written as plain lists through a 1 MB buffer rather than copied into dicts.
+    """
+    # Assume all records have the same keys
+    record_fields = list(items[0].record.keys()) if items else []
+    with open(filename, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+        writer = csv.writer(f, delimiter=',')
+        writer.writerow(record_fields + ["Result", column])
+        for rec, value in items:
+            writer.writerow([rec.get(field, '') for field in record_fields]
+                            + [result, value or ""])
+
+
+def process_failures(failures: List[FailureResult], csv_file: str, logger) -> None:
+    """Legacy function to save failed records using save_failed_records from utils."""
+    if not failures:
+        return
+    failed_records = []
+    for f in failures:
+        r = dict(f.record)
+        r["Error"] = f.error
+        failed_records.append(r)
+    error_file = save_failed_records(failed_records, csv_file)
+    logger.info(f"Legacy failed records saved to: {error_file}")
+
+
+def run(args) -> None:
+    """Run an upload for the parsed command line arguments."""
+    logger = setup_logging(args.config)
+
+    try:
+        from src.salesforce import SalesforceClient
+        sf = SalesforceClient(args.config)
+        logger.info(f"Initialised connection to Salesforce. Session ID: {sf.sf.session_id}")
+        # Rows are streamed from the CSV; only the first is needed up front
+        # to prompt for the field mapping
+        records = read_csv(args.csv_file, args.config)
+        first_record = next(records, None)
+        sample = [first_record] if first_record is not None else []
+        logger.info(f"Reading records from {args.csv_file}")
+        field_mapping = prompt_field_mapping(sample, logger)
+        mapped_records = apply_field_mapping(chain(sample, records), field_mapping)
+        successes, failures = perform_operation_in_batches(
+            args.object_name,
+            args.operation,
+            mapped_records,
+            sf,
+            args.external_id_field,
+            args.batch_size,
+            logger,
+            sf.config['api'].get('max_concurrency', 5)
+        )
+        logger.info(f"Operation '{args.operation}' completed for "
+                    f"{len(successes) + len(failures)} records from {args.csv_file}.")
+        logger.info(f"  Successful records: {len(successes)}")
+        logger.info(f"  Failed records:     {len(failures)}")
+        save_upload_results(successes, failures, args.csv_file, logger)
+    except Exception as e:
+        logger.error(f"Error during upload: {str(e)}")
+        # Keep a record of what was applied before a batch failed outright
+        partial_results = getattr(e, 'partial_results', None)
+        if partial_results is not None:
+            save_upload_results(*partial_results, args.csv_file, logger)
+        sys.exit(1)
+
@@ -1,61 +1,151 @@
 """
 Utility functions for logging and data processing.
 """
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 import csv
-from typing import Dict, List, Optional
+import functools
+import importlib.util
+import json
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import yaml
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib codec
+    orjson = None
 
-def setup_logging(config_path: str = 'config/config.yaml') -> logging.Logger:
-    """Set up logging configuration."""
-    # Load config
+# Use the libyaml C loader when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def json_dumps(payload) -> bytes:
+    """Serialise a payload to JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode()
+
+
+def json_loads(content):
+    """Decode a JSON document from bytes or str, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+@functools.lru_cache(maxsize=8)
+def _read_config(config_path: str, mtime: float) -> Dict:
+    """Parse a YAML configuration file; the mtime only serves as part of the cache key."""
     with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
-
-    # Create logs directory if it doesn't exist
-    os.makedirs(os.path.dirname(config['logging']['file']), exist_ok=True)
-
-    # Configure logging
-    logging.basicConfig(
-        level=config['logging']['level'],
-        format=config['logging']['format'],
-        handlers=[
-            logging.FileHandler(config['logging']['file']),
-            logging.StreamHandler()
-        ]
-    )
+        return yaml.load(f, Loader=_YAML_LOADER)
+
+
+def load_config(config_path: str) -> Dict:
+    """
+    Load and cache a YAML configuration file; callers must not mutate the result.
+    Entries are keyed by absolute path and mtime, so edits are picked up on the next call.
+    """
+    config_path = os.path.abspath(config_path)
+    return _read_config(config_path, os.path.getmtime(config_path))
+
+
+class _DirCreatingFileHandler(logging.FileHandler):
+    """FileHandler that creates the log directory when the file is first opened."""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+@functools.lru_cache(maxsize=4)
+def setup_logging(config_path: str = 'config/config.yaml') -> logging.Logger:
+    """Set up logging configuration once per config file and return the logger."""
+    config = load_config(config_path)
+
+    # Configure logging, unless the root logger already has handlers attached
+    root = logging.getLogger()
+    if not root.handlers:
+        formatter = logging.Formatter(config['logging']['format'])
+        # delay=True leaves the log file, and its directory, uncreated until
+        # the first record is written
+        file_handler = _DirCreatingFileHandler(config['logging']['file'], delay=True)
+        stream_handler = logging.StreamHandler()
+        file_handler.setFormatter(formatter)
+        stream_handler.setFormatter(formatter)
+
+        # Callers only enqueue records; a listener thread does the file and
+        # console I/O so logging never blocks the upload loop
+        log_queue = queue.Queue(-1)
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        root.addHandler(queue_handler)
+        root.setLevel(config['logging']['level'])
+        listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+        # Kept on the handler, as logging.config does, so the listener can be stopped
+        queue_handler.listener = listener
+        listener.start()
+        # Flush any queued records on interpreter exit
+        atexit.register(listener.stop)
 
     return logging.getLogger(__name__)
 
 
-def read_csv(filepath: str, config_path: str = 'config/config.yaml') -> List[Dict]:
-    """Read CSV file and return list of dictionaries."""
-    # Load config
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
+def read_csv(filepath: str, config_path: str = 'config/config.yaml') -> Iterator[Dict]:
+    """
+    Read a CSV file lazily, yielding one dictionary per row.
+    Rows are streamed so callers can start processing before the whole file is read.
+    Files larger than csv.arrow_threshold bytes are parsed with pyarrow when it is installed.
+    """
+    config = load_config(config_path)
+    arrow_threshold = config['csv'].get('arrow_threshold', 10_000_000)
 
-    data = []
     try:
+        if (os.path.getsize(filepath) > arrow_threshold
+                and importlib.util.find_spec('pyarrow') is not None):
+            yield from _read_csv_arrow(filepath, config)
+            return
         with open(filepath, 'r', encoding=config['csv']['encoding']) as f:
             reader = csv.DictReader(f, delimiter=config['csv']['delimiter'])
-            data = [row for row in reader]
+            yield from reader
     except Exception as e:
         logger = setup_logging(config_path)
         logger.error(f"Error reading CSV file {filepath}: {str(e)}")
         raise
 
-    return data
+
+def _read_csv_arrow(filepath: str, config: Dict) -> Iterator[Dict]:
+    """Stream CSV rows using pyarrow's multithreaded C++ parser, one record batch at a time."""
+    import pyarrow as pa
+    import pyarrow.csv as pac
+
+    encoding = config['csv']['encoding']
+    delimiter = config['csv']['delimiter']
+
+    # Read every column as a string, matching csv.DictReader's output
+    with open(filepath, 'r', encoding=encoding, newline='') as f:
+        header = next(csv.reader(f, delimiter=delimiter), [])
+
+    reader = pac.open_csv(
+        filepath,
+        read_options=pac.ReadOptions(encoding=encoding),
+        parse_options=pac.ParseOptions(delimiter=delimiter, newlines_in_values=True),
+        convert_options=pac.ConvertOptions(
+            column_types={name: pa.string() for name in header},
+            strings_can_be_null=False
+        )
+    )
+    for batch in reader:
+        yield from batch.to_pylist()
 
 
 def save_failed_records(records: List[Dict], original_filename: str,
                         config_path: str = 'config/config.yaml') -> str:
     """Save failed records to a new CSV file in the error directory."""
-    # Load config
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
+    config = load_config(config_path)
 
     # Create error directory if it doesn't exist
     os.makedirs(config['csv']['error_directory'], exist_ok=True)
@@ -80,6 +170,54 @@ def save_failed_records(records: List[Dict], original_filename: str,
     return filepath
 
 
-def chunk_list(data: List, chunk_size: int) -> List[List]:
-    """Split a list into chunks of specified size."""
-    return [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+def chunk_list(data: Iterable, chunk_size: int) -> Iterator[List]:
+    """Lazily split an iterable into lists of at most chunk_size items."""
+    iterator = iter(data)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def build_sobject_collection_payload(
+    records: List[Dict],
+    object_name: str,
+    operation: str,
+    external_id_field: str = None
+) -> Tuple[str, str, Optional[Dict]]:
+    """
+    Build a request for Salesforce's SObject Collection API for up to 200 records at once.
+    This covers insert, update, delete, upsert. Upsert requires an external ID field.
+    Returns (endpoint, method, payload); payload is None for delete, which sends only Ids.
+    """
+    if operation == "delete":
+        # Delete only needs the Ids, passed in the query string with no body,
+        # so skip building record dicts and read them in a single pass
+        try:
+            ids = ','.join(r["Id"] for r in records)
+        except KeyError:
+            raise ValueError("Record is missing an 'Id' field for delete.") from None
+        return f"composite/sobjects?ids={ids}&allOrNone=false", "DELETE", None
+
+    if operation == "insert":
+        endpoint, method = "composite/sobjects", "POST"
+    elif operation == "update":
+        endpoint, method = "composite/sobjects", "PATCH"
+    elif operation == "upsert":
+        # Upsert requires the external ID field
+        if not external_id_field:
+            raise ValueError("Must specify --external_id_field for upsert.")
+        endpoint, method = f"composite/sobjects/{object_name}/{external_id_field}", "PATCH"
+    else:
+        raise ValueError(f"Unknown operation: {operation}")
+
+    # Records must carry the key the operation is matched on
+    if operation != "insert":
+        key_field = external_id_field if operation == "upsert" else "Id"
+        for r in records:
+            if key_field not in r:
+                raise ValueError(f"Record is missing an '{key_field}' field for {operation}.")
+
+    # Only the object type is needed per record; the operation is implied
+    # by the endpoint and method, which keeps each request body smaller
+    attributes = {"type": object_name}
+    payload = {"allOrNone": False, "records": [{"attributes": attributes, **r} for r in records]}
+    return endpoint, method, payload
@@ -0,0 +1,18 @@
+"""
+Shared pytest fixtures.
+"""
+import pytest
+from src.utils import setup_logging
+
+
+@pytest.fixture(scope='session')
+def logger():
+    """Configure logging once for the whole test session."""
+    return setup_logging('config/config.yaml')
+
+
+@pytest.fixture(scope='session')
+def sf_client():
+    """Authenticate to Salesforce once and share the client across integration tests."""
+    from src.salesforce import SalesforceClient
+    return SalesforceClient('config/config.yaml')
@@ -1,14 +1,22 @@
+import csv
 import json
+import logging
+import threading
 import pytest
+import requests
+from unittest.mock import patch
 from src.utils import chunk_list, setup_logging
-from scripts.upload_data import perform_operation_in_batches
+from src.upload_core import (
+    FailureResult,
+    SuccessResult,
+    apply_field_mapping,
+    perform_operation_in_batches,
+    save_upload_results
+)
 
 # Create a fake Salesforce client that simulates successful API responses
 class FakeSalesforce:
-    def __init__(self):
-        self.sf = self
-
-    def restful(self, endpoint, method, data=None):
+    def rest_call(self, endpoint, method, data=None):
         # Parse the payload to determine how many records were sent in this batch
         if data:
             payload = json.loads(data)
@@ -33,13 +41,36 @@ def test_chunk_list_large_number_of_records():
     # Create a list of 450 dummy items
     records = list(range(450))
     # Use a batch size of 200 (default)
-    chunks = chunk_list(records, 200)
+    chunks = list(chunk_list(records, 200))
     # Expect 3 chunks: 200, 200, and 50 items respectively
     assert len(chunks) == 3, "Expected 3 chunks for 450 records with batch_size=200"
     assert len(chunks[0]) == 200, "First chunk should have 200 records"
     assert len(chunks[1]) == 200, "Second chunk should have 200 records"
     assert len(chunks[2]) == 50, "Third chunk should have 50 records"
 
+def test_chunk_list_streams_generator():
+    # chunk_list should accept a generator and only pull one chunk at a time
+    consumed = []
+
+    def records():
+        for i in range(5):
+            consumed.append(i)
+            yield i
+
+    chunks = chunk_list(records(), 2)
+    assert next(chunks) == [0, 1]
+    assert consumed == [0, 1], "Only the first chunk should have been read"
+    assert list(chunks) == [[2, 3], [4]]
+
+def test_apply_field_mapping():
+    # Mapped fields are renamed, unmapped ones dropped, and missing ones skipped
+    records = [{"Name": "Acme", "Notes": "x", "Phone": "1"}, {"Name": "Beta"}]
+    mapping = {"Name": "Name", "Phone": "Phone__c"}
+    assert list(apply_field_mapping(records, mapping)) == [
+        {"Name": "Acme", "Phone__c": "1"},
+        {"Name": "Beta"}
+    ]
+
 def test_bulkify_large_number_of_records(logger):
     # Create 450 dummy records (simulate an unlimited record set)
     records = [{"Field": f"Value {i}"} for i in range(450)]
@@ -56,4 +87,118 @@ def test_bulkify_large_number_of_records(logger):
     )
     # Verify that all records are processed successfully with no failures
     assert len(successes) == 450, "All 450 records should be processed successfully"
-    assert len(failures) == 0, "There should be no failures in processing the records"
\ No newline at end of file
+    assert len(failures) == 0, "There should be no failures in processing the records"
+
+def test_bulkify_drops_duplicate_ids_within_batch(logger):
+    # Repeated Ids in one batch are collapsed to the last occurrence before sending
+    records = [{"Id": "001A", "Name": "old"}, {"Id": "001B", "Name": "b"},
+               {"Id": "001A", "Name": "new"}]
+    successes, failures = perform_operation_in_batches(
+        "Account", "update", records, FakeSalesforce(), None, 200, logger)
+    assert len(failures) == 0
+    assert [s.record for s in successes] == [{"Id": "001A", "Name": "new"},
+                                            {"Id": "001B", "Name": "b"}]
+
+def test_bulkify_concurrent_batches_keep_order(logger):
+    # Send 450 records as 3 batches in parallel and check results stay in input order
+    records = [{"Field": f"Value {i}"} for i in range(450)]
+    successes, failures = perform_operation_in_batches(
+        "FakeObject",
+        "insert",
+        records,
+        FakeSalesforce(),
+        external_id_field=None,
+        batch_size=200,
+        logger=logger,
+        max_concurrency=3
+    )
+    assert len(failures) == 0
+    assert [s.record for s in successes] == records, "Results should follow input order"
+
+
+def test_save_upload_results_writes_rows(tmp_path, monkeypatch):
+    """Test result files keep the record columns and append the outcome columns."""
+    monkeypatch.chdir(tmp_path)
+    successes = [SuccessResult({"Name": "Acme", "Phone": "1"}, "001A")]
+    failures = [FailureResult({"Name": "Beta", "Phone": "2"}, "REQUIRED_FIELD_MISSING")]
+
+    save_upload_results(successes, failures, "input.csv", logging.getLogger("test"))
+
+    results_dir = tmp_path / "results"
+    with open(next(results_dir.glob("upload_success_*.csv")), newline='') as f:
+        assert list(csv.reader(f)) == [["Name", "Phone", "Result", "SalesforceId"],
+                                       ["Acme", "1", "Success", "001A"]]
+    with open(next(results_dir.glob("upload_errors_*.csv")), newline='') as f:
+        assert list(csv.reader(f)) == [["Name", "Phone", "Result", "Error"],
+                                       ["Beta", "2", "Error", "REQUIRED_FIELD_MISSING"]]
+
+
+class FlakySalesforce(FakeSalesforce):
+    """Fake client whose first call fails with the given error."""
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+        self.calls = 0
+
+    def rest_call(self, endpoint, method, data=None):
+        self.calls += 1
+        if self.calls == 1:
+            raise self.error
+        return super().rest_call(endpoint, method, data)
+
+
+@patch('src.upload_core.time.sleep')
+def test_transient_errors_are_retried(mock_sleep, logger):
+    # A dropped connection is replayed for update, which is idempotent
+    fake_sf = FlakySalesforce(requests.exceptions.ConnectionError("reset"))
+    records = [{"Id": f"001{i:012d}", "Name": "x"} for i in range(3)]
+    successes, failures = perform_operation_in_batches(
+        "Account", "update", records, fake_sf, None, 200, logger)
+    assert len(successes) == 3 and not failures
+    assert fake_sf.calls == 2
+    mock_sleep.assert_called_once()
+
+
+@patch('src.upload_core.time.sleep')
+def test_insert_not_replayed_after_dropped_connection(mock_sleep, logger):
+    # The batch may already have been applied, so inserts must not be resent
+    fake_sf = FlakySalesforce(requests.exceptions.ConnectionError("reset"))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        perform_operation_in_batches(
+            "Account", "insert", [{"Name": "x"}], fake_sf, None, 200, logger)
+    assert fake_sf.calls == 1
+    mock_sleep.assert_not_called()
+
+
+class FailingBatchSalesforce(FakeSalesforce):
+    """Fake client that fails the 'bad' batch once the batch after it is in flight."""
+    def __init__(self):
+        super().__init__()
+        self.names = []
+        self.next_batch_started = threading.Event()
+
+    def rest_call(self, endpoint, method, data=None):
+        name = json.loads(data)["records"][0]["Name"]
+        self.names.append(name)
+        if name == "bad":
+            self.next_batch_started.wait(timeout=5)
+            raise ValueError("Bad request")
+        if name == "after":
+            self.next_batch_started.set()
+        return super().rest_call(endpoint, method, data)
+
+
+def test_failed_batch_keeps_in_flight_outcomes(logger):
+    # The batch sent alongside the failing one is waited for and recorded;
+    # batches after it are never sent
+    fake_sf = FailingBatchSalesforce()
+    records = [{"Name": n} for n in ("first", "bad", "after", "never", "never")]
+    with pytest.raises(ValueError) as exc_info:
+        perform_operation_in_batches(
+            "Account", "insert", records, fake_sf, None, 1, logger, max_concurrency=2)
+
+    successes, failures = exc_info.value.partial_results
+    assert [s.record["Name"] for s in successes] == ["first", "after"]
+    assert not failures
+    assert "never" not in fake_sf.names
+
@@ -3,14 +3,21 @@ from scripts.manipulate_data import (
     clean_text,
     extract_phone_number,
     extract_email,
+    extract_contacts,
     extract_address,
     search_company_info,
+    _lookup_company,
+    enrich_many,
+    enrich_csv,
     get_salesforce_record,
-    prepare_record_update
+    get_salesforce_records,
+    prepare_record_update,
+    update_salesforce_records,
+    format_json
 )
 import pytest
 from unittest.mock import Mock, patch
-from bs4 import BeautifulSoup
+from lxml import html
 import json
 import os
 import sys
@@ -52,10 +59,17 @@ MOCK_SALESFORCE_RECORD = {
 }
 
 
+@pytest.fixture(autouse=True)
+def clear_company_cache():
+    """Stop cached company lookups leaking between tests."""
+    yield
+    _lookup_company.cache_clear()
+
+
 @pytest.fixture
-def mock_soup():
-    """Create a BeautifulSoup fixture for testing."""
-    return BeautifulSoup(MOCK_HTML, 'html.parser')
+def mock_tree():
+    """Create a parsed HTML tree fixture for testing."""
+    return html.fromstring(MOCK_HTML)
 
 
 def test_clean_text():
@@ -78,6 +92,14 @@ def test_extract_phone_number():
     # Test international format
     assert extract_phone_number("Int: +44 20 7123 4567") == "+44 20 7123 4567"
 
+    # A US number wins over an earlier year range or long reference number
+    assert extract_phone_number(
+        "Copyright 2010-2024 Acme. Tel: +1 415 555 1234") == "+1 415 555 1234"
+    assert extract_phone_number(
+        "Order #12345678 ships soon, call (415) 555-1234") == "(415) 555-1234"
+    assert extract_phone_number(
+        "Reg no 20240101 Tel 415.555.1234") == "415.555.1234"
+
 
 def test_extract_email():
     """Test email extraction."""
@@ -87,20 +109,52 @@ def test_extract_email():
     assert extract_email("No email here") is None
 
 
-def test_extract_address(mock_soup):
+def test_extract_contacts():
+    """Test combined phone and email extraction."""
+    text = "Call +1 (555) 123-4567 or email Contact@TestCompany.com"
+    assert extract_contacts(text) == (
+        "+1 (555) 123-4567", "contact@testcompany.com")
+    assert extract_contacts("Email: info@example.com") == (
+        None, "info@example.com")
+    assert extract_contacts("Nothing useful here") == (None, None)
+    assert extract_contacts(
+        "Copyright 2010-2024 Acme. Tel: +1 415 555 1234, sales@acme.com") == (
+        "+1 415 555 1234", "sales@acme.com")
+    assert extract_contacts("Int: +44 20 7123 4567") == ("+44 20 7123 4567", None)
+
+
+def test_extract_address(mock_tree):
     """Test address extraction from HTML."""
-    address = extract_address(mock_soup)
+    address = extract_address(mock_tree)
     assert address is not None
     assert "123 Tech Street" in address
     assert "San Francisco" in address
 
 
-@patch('requests.get')
+def test_extract_address_prefers_address_class():
+    """Test that an 'address' element wins over a preceding 'location' one."""
+    tree = html.fromstring("""
+        <div class="Location">1 Old Road, Springfield, IL</div>
+        <span class="street-address">42 Main Street, Boston, MA</span>
+    """)
+    assert extract_address(tree) == "42 Main Street, Boston, MA"
+    assert extract_address(html.fromstring("<p>No address</p>")) is None
+
+
+def test_extract_address_joins_split_elements():
+    """Test an address split across spans and line breaks keeps its commas tight."""
+    tree = html.fromstring(
+        '<div class="address"><span>42 Main Street</span>, '
+        '<span>Boston</span>,<br>MA 02110</div>')
+    assert extract_address(tree) == "42 Main Street, Boston, MA 02110"
+
+
+@patch('scripts.manipulate_data.SESSION.get')
 def test_search_company_info(mock_get):
     """Test company information search with mocked requests."""
     # Mock the Google search response
     mock_google_response = Mock()
-    mock_google_response.text = """
+    mock_google_response.content = b"""
         <html>
             <a href="url?q=https://testcompany.com&sa=U">Test Company</a>
         </html>
@@ -108,7 +162,9 @@ def test_search_company_info(mock_get):
 
     # Mock the company website response
     mock_company_response = Mock()
-    mock_company_response.text = MOCK_HTML
+    mock_company_response.content = MOCK_HTML.encode()
+    mock_company_response.headers = {'Content-Type': 'text/html; charset=utf-8'}
+    mock_company_response.encoding = 'utf-8'
 
     # Configure the mock to return different responses for different URLs
     def mock_get_response(*args, **kwargs):
@@ -126,6 +182,79 @@ def test_search_company_info(mock_get):
     assert "123 Tech Street" in result['address']
     assert result['website'] == "https://testcompany.com"
 
+    # Repeat lookups, even with different spacing or case, are served from the cache
+    assert search_company_info("  test   COMPANY ") == result
+    assert mock_get.call_count == 2
+
+
+@patch('scripts.manipulate_data.SESSION.get')
+def test_search_company_info_skips_aggregator_links(mock_get):
+    """Test result links to Google/YouTube/Facebook are passed over."""
+    search_response = Mock()
+    search_response.content = b"""
+        <a href="/url?q=https://www.youtube.com/watch%3Fv%3D1&amp;sa=U">Video</a>
+        <a href="/url?q=https://testcompany.com/contact&amp;sa=U&amp;ved=2">Site</a>
+    """
+    company_response = Mock()
+    company_response.content = MOCK_HTML.encode()
+    company_response.headers = {'Content-Type': 'text/html; charset=utf-8'}
+    company_response.encoding = 'utf-8'
+    mock_get.side_effect = [search_response, company_response]
+
+    assert search_company_info("Test Company")['website'] == "https://testcompany.com/contact"
+    assert mock_get.call_args[0][0] == "https://testcompany.com/contact"
+
+
+@pytest.mark.parametrize('content_type, meta', [
+    ('text/html; charset=utf-8', ''),  # Charset declared in the header
+    ('text/html', '<meta charset="utf-8">'),  # Only the page declares it
+    ('text/html', ''),  # Neither does; detected from the bytes
+])
+@patch('scripts.manipulate_data.SESSION.get')
+def test_search_company_info_decodes_utf8_page(mock_get, content_type, meta):
+    """Test UTF-8 pages keep their non-ASCII text however the charset is declared."""
+    search_response = Mock()
+    search_response.content = b'<a href="/url?q=https://societe.fr&amp;sa=U">Site</a>'
+    company_response = Mock()
+    company_response.content = (
+        f'<html><head>{meta}</head><body>'
+        '<div class="address">12 Société Street, Paris, IDF</div>'
+        '</body></html>').encode('utf-8')
+    company_response.headers = {'Content-Type': content_type}
+    # requests falls back to ISO-8859-1 for text/html without a charset parameter
+    company_response.encoding = 'utf-8' if 'charset' in content_type else 'ISO-8859-1'
+    company_response.apparent_encoding = 'utf-8'
+    mock_get.side_effect = [search_response, company_response]
+
+    assert search_company_info("Société")['address'] == "12 Société Street, Paris, IDF"
+
+
+@patch('scripts.manipulate_data.search_company_info')
+def test_enrich_many(mock_search):
+    """Test concurrent enrichment keeps results in input order."""
+    mock_search.side_effect = lambda name: {'website': f"https://{name}.com"}
+
+    results = enrich_many(['alpha', 'beta', 'gamma'], max_workers=2)
+
+    assert [r['website'] for r in results] == [
+        'https://alpha.com', 'https://beta.com', 'https://gamma.com']
+    assert mock_search.call_count == 3
+
+
+@patch('scripts.manipulate_data.search_company_info')
+def test_enrich_csv(mock_search, tmp_path):
+    """Test enriching every row of a CSV file by company name."""
+    csv_file = tmp_path / 'companies.csv'
+    csv_file.write_text("Name,Industry\nAlpha,Tech\nBeta,Retail\n")
+    mock_search.side_effect = lambda name: {'phone': f"{name}-phone"}
+
+    rows = enrich_csv(str(csv_file), 'config/config.yaml', max_workers=2)
+
+    assert rows == [
+        {'Name': 'Alpha', 'Industry': 'Tech', 'phone': 'Alpha-phone'},
+        {'Name': 'Beta', 'Industry': 'Retail', 'phone': 'Beta-phone'}
+    ]
+
 
 @patch('src.salesforce.SalesforceClient')
 def test_get_salesforce_record(mock_sf_client):
@@ -142,6 +271,57 @@ def test_get_salesforce_record(mock_sf_client):
     assert record is not None
     assert record['Id'] == '001XX000003G9yyYAC'
     assert record['Name'] == 'Test Company'
+    soql = mock_sf_client.query.call_args[0][0]
+    assert soql == ("SELECT BillingStreet, Id, Name, Phone, Website "
+                    "FROM Account WHERE Id = '001XX000003G9yyYAC'")
+
+
+def test_get_salesforce_records():
+    """Test batched Salesforce record retrieval with IN-clause queries."""
+    mock_client = Mock()
+    mock_client.query.side_effect = [
+        [{'Id': '001XX000003G9yyYAA', 'Name': 'First'},
+         {'Id': '001XX000003G9yyYAB', 'Name': 'Second'}],
+        [{'Id': '001XX000003G9yyYAC', 'Name': 'Third'}]
+    ]
+    ids = ['001XX000003G9yyYAA', '001XX000003G9yyYAB', '001XX000003G9yyYAC']
+
+    records = get_salesforce_records(
+        mock_client, ids, 'Account', {'Phone'}, chunk_size=2)
+
+    assert set(records) == set(ids)
+    assert records['001XX000003G9yyYAC']['Name'] == 'Third'
+    assert mock_client.query.call_count == 2
+    first_soql = mock_client.query.call_args_list[0][0][0]
+    assert first_soql == ("SELECT Id, Name, Phone FROM Account WHERE Id IN "
+                          "('001XX000003G9yyYAA', '001XX000003G9yyYAB')")
+
+
+def test_get_salesforce_record_invalid_id():
+    """Test that malformed record IDs are rejected before querying."""
+    mock_client = Mock()
+
+    with pytest.raises(ValueError):
+        get_salesforce_record(
+            mock_client, "001' OR Name != '", 'Account', {'Phone'})
+    mock_client.query.assert_not_called()
+
+
+def test_get_salesforce_records_skips_invalid_ids():
+    """Test malformed IDs are left out of the query instead of failing the batch."""
+    mock_client = Mock()
+    mock_client.query.return_value = [{'Id': '001XX000003G9yyYAA', 'Name': 'First'}]
+
+    records = get_salesforce_records(
+        mock_client, ['001XX000003G9yyYAA', "001' OR Name != '"], 'Account', {'Phone'})
+
+    assert set(records) == {'001XX000003G9yyYAA'}
+    soql = mock_client.query.call_args[0][0]
+    assert soql.endswith("WHERE Id IN ('001XX000003G9yyYAA')")
+
+    mock_client.query.reset_mock()
+    assert get_salesforce_records(mock_client, ['bad id'], 'Account', {'Phone'}) == {}
+    mock_client.query.assert_not_called()
 
 
 def test_prepare_record_update():
@@ -167,6 +347,96 @@ def test_prepare_record_update():
     assert update_data['BillingState'] == 'CA'
 
 
+def test_prepare_record_update_address_formats():
+    """Test address parsing for short and unparseable addresses."""
+    record_id = '001XX000003G9yyYAC'
+    fields = {'BillingStreet', 'BillingCity', 'BillingState', 'BillingPostalCode'}
+
+    update_data = prepare_record_update(
+        record_id, {'address': '1 Main Street, Boston, MA 02110-1234'},
+        'Account', fields)
+    assert update_data == {
+        'Id': record_id,
+        'BillingStreet': '1 Main Street',
+        'BillingCity': 'Boston',
+        'BillingState': 'MA',
+        'BillingPostalCode': '021101234'
+    }
+
+    update_data = prepare_record_update(
+        record_id, {'address': '123 Main St, Springfield, IL, 62704'},
+        'Account', fields)
+    assert update_data == {
+        'Id': record_id,
+        'BillingStreet': '123 Main St',
+        'BillingCity': 'Springfield',
+        'BillingState': 'IL',
+        'BillingPostalCode': '62704'
+    }
+
+    update_data = prepare_record_update(
+        record_id,
+        {'address': '1600 Amphitheatre Pkwy, Mountain View, CA 94043, USA'},
+        'Account', fields | {'BillingCountry'})
+    assert update_data == {
+        'Id': record_id,
+        'BillingStreet': '1600 Amphitheatre Pkwy',
+        'BillingCity': 'Mountain View',
+        'BillingState': 'CA',
+        'BillingPostalCode': '94043',
+        'BillingCountry': 'USA'
+    }
+
+    update_data = prepare_record_update(
+        record_id, {'address': '9 Elm Rd, Apt 4, Springfield, IL 62704'},
+        'Account', fields | {'BillingCountry'})
+    assert update_data['BillingStreet'] == '9 Elm Rd, Apt 4'
+    assert update_data['BillingCity'] == 'Springfield'
+    assert update_data['BillingCountry'] == 'United States'
+
+    update_data = prepare_record_update(
+        record_id, {'address': 'Somewhere in Boston'}, 'Account', fields)
+    assert update_data == {'Id': record_id}
+
+
+def test_update_salesforce_records():
+    """Test multi-record updates are delegated to the client's bulk_update."""
+    mock_client = Mock()
+    mock_client.bulk_update.side_effect = lambda object_name, data: [
+        {'id': r['Id'], 'success': True, 'errors': []} for r in data]
+    rows = [{'Id': f"001XX000003G9{i:05d}", 'Phone': '555'} for i in range(250)]
+
+    assert update_salesforce_records(mock_client, rows, 'Account') is True
+    mock_client.bulk_update.assert_called_once_with('Account', rows)
+
+
+def test_update_salesforce_records_failures():
+    """Test a failed row or a failed call is reported as an unsuccessful update."""
+    mock_client = Mock()
+    mock_client.bulk_update.return_value = [
+        {'id': '001XX000003G9yyYAC', 'success': True, 'errors': []},
+        {'id': '001XX000003G9zzYAC', 'success': False,
+         'errors': [{'message': 'Invalid phone'}]}
+    ]
+    rows = [{'Id': '001XX000003G9yyYAC'}, {'Id': '001XX000003G9zzYAC'}]
+    assert update_salesforce_records(mock_client, rows, 'Account') is False
+
+    mock_client.bulk_update.side_effect = Exception("Bulk update failed")
+    assert update_salesforce_records(mock_client, rows, 'Account') is False
+
+
+def test_format_json():
+    """Test JSON preview formatting matches the stdlib indented output."""
+    assert format_json(MOCK_SALESFORCE_RECORD) == json.dumps(
+        MOCK_SALESFORCE_RECORD, indent=2)
+
+
+def test_format_json_non_ascii():
+    """Test non-ASCII values are escaped like json.dumps."""
+    record = {**MOCK_SALESFORCE_RECORD, 'Name': 'Société Générale', 'BillingCity': 'Zürich'}
+    assert format_json(record) == json.dumps(record, indent=2)
+
+
 @pytest.mark.integration
 def test_full_integration():
     """
@@ -1,9 +1,13 @@
 """
 Unit tests for Salesforce client.
 """
+import json
 import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import ANY, MagicMock, patch
 from src.salesforce import SalesforceClient
 from simple_salesforce import Salesforce
 from simple_salesforce.exceptions import SalesforceError
@@ -34,26 +38,93 @@ def mock_env_vars(monkeypatch):
 def mock_sf_client(mock_config):
     """Fixture for mock Salesforce client."""
     with patch('src.salesforce.Salesforce') as mock_sf:
-        with patch('src.salesforce.yaml.safe_load', return_value=mock_config):
+        with patch('src.salesforce.load_config', return_value=mock_config):
             client = SalesforceClient()
             client.sf = mock_sf.return_value
+            client.sf.base_url = 'https://test.my.salesforce.com/services/data/v57.0/'
             yield client
 
 
+def _response(body):
+    """Build a fake HTTP response carrying the given JSON body."""
+    response = MagicMock()
+    response.content = json.dumps(body).encode()
+    return response
+
+
 def test_authentication(mock_env_vars, mock_config):
     """Test Salesforce authentication."""
     with patch('src.salesforce.Salesforce') as mock_sf:
-        with patch('src.salesforce.yaml.safe_load', return_value=mock_config):
+        with patch('src.salesforce.load_config', return_value=mock_config):
             client = SalesforceClient()
             mock_sf.assert_called_once_with(
                 username='test@example.com',
                 password='password123',
                 security_token='token123',
                 domain='test',
-                version='57.0'
+                version='57.0',
+                session=ANY
             )
 
 
+def test_session_pool_configuration(mock_config):
+    """Test the HTTP session pool is sized from the API configuration."""
+    mock_config['api']['pool_maxsize'] = 40
+    with patch('src.salesforce.Salesforce') as mock_sf:
+        with patch('src.salesforce.load_config', return_value=mock_config):
+            SalesforceClient()
+    session = mock_sf.call_args.kwargs['session']
+    adapter = session.get_adapter('https://example.my.salesforce.com')
+    assert adapter._pool_maxsize == 40
+    assert adapter._pool_block is True
+    assert adapter.max_retries.total == 5
+
+
+def test_session_pool_not_smaller_than_concurrency(mock_config):
+    """Test the blocking pool always has a connection per upload worker."""
+    mock_config['api'].update(pool_maxsize=4, max_concurrency=10)
+    with patch('src.salesforce.Salesforce') as mock_sf:
+        with patch('src.salesforce.load_config', return_value=mock_config):
+            SalesforceClient()
+    session = mock_sf.call_args.kwargs['session']
+    adapter = session.get_adapter('https://example.my.salesforce.com')
+    assert adapter._pool_maxsize == 10
+    assert adapter._pool_connections == 10  # requests' default number of host pools
+
+
+@patch('urllib3.util.retry.time.sleep')
+def test_session_returns_last_response_when_retries_run_out(mock_sleep, mock_config):
+    """Test a persistent 503 comes back as a response rather than a RetryError."""
+    attempts = []
+
+    class UnavailableHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            attempts.append(self.path)
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), UnavailableHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with patch('src.salesforce.Salesforce') as mock_sf:
+            with patch('src.salesforce.load_config', return_value=mock_config):
+                SalesforceClient()
+        session = mock_sf.call_args.kwargs['session']
+        # The adapter is only mounted for https; reuse it for the local server
+        session.mount('http://', session.get_adapter('https://example.my.salesforce.com'))
+        response = session.get(f"http://127.0.0.1:{server.server_port}/services/data")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert response.status_code == 503
+    assert len(attempts) == 6
+
+
 def test_query_success(mock_sf_client):
     """Test successful SOQL query."""
     mock_sf_client.sf.query.return_value = {
@@ -66,40 +137,152 @@ def test_query_success(mock_sf_client):
         'SELECT Id, Name FROM Account')
 
 
-def test_query_error(mock_sf_client):
+@pytest.mark.parametrize('run_query', [
+    lambda client, soql: client.query(soql),
+    lambda client, soql: list(client.query_iter(soql))
+], ids=['query', 'query_iter'])
+def test_query_error(mock_sf_client, run_query):
     """Test SOQL query error handling."""
     error = SalesforceError('Query failed', status=400,
                             resource_name='query', content={})
     mock_sf_client.sf.query.side_effect = error
+    mock_sf_client.sf.query_all_iter.side_effect = error
 
     with pytest.raises(Exception) as exc_info:
-        mock_sf_client.query('SELECT Invalid FROM Account')
+        run_query(mock_sf_client, 'SELECT Invalid FROM Account')
     expected_error = 'Query failed: Unknown error occurred for {url}. Response content: {content}'
     assert str(exc_info.value) == expected_error
+    assert exc_info.value.__cause__ is error
+
+
+def test_query_iter_success(mock_sf_client):
+    """Test lazily iterating SOQL query results."""
+    mock_sf_client.sf.query_all_iter.return_value = iter([
+        {'Id': '001', 'Name': 'Test'},
+        {'Id': '002', 'Name': 'Test 2'}
+    ])
+
+    results = mock_sf_client.query_iter('SELECT Id, Name FROM Account')
+    assert list(results) == [{'Id': '001', 'Name': 'Test'},
+                             {'Id': '002', 'Name': 'Test 2'}]
+    mock_sf_client.sf.query_all_iter.assert_called_once_with(
+        'SELECT Id, Name FROM Account')
 
 
 def test_bulk_insert_success(mock_sf_client):
-    """Test successful bulk insert."""
+    """Test successful bulk insert via SObject Collections."""
+    mock_sf_client.sf._call_salesforce.return_value = _response([
+        {'success': True, 'id': '001', 'errors': []}])
+
+    records = [{'Name': 'Test Account'}]
+    results = mock_sf_client.bulk_insert('Account', records)
+
+    assert results == [{'success': True, 'id': '001', 'errors': []}]
+    method, url = mock_sf_client.sf._call_salesforce.call_args[0]
+    kwargs = mock_sf_client.sf._call_salesforce.call_args[1]
+    assert method == 'POST'
+    assert url == 'https://test.my.salesforce.com/services/data/v57.0/composite/sobjects'
+    assert kwargs['name'] == 'composite/sobjects'
+    assert json.loads(kwargs['data'])['records'][0]['Name'] == 'Test Account'
+
+
+def test_bulk_insert_large_load_uses_bulk_api(mock_sf_client):
+    """Test bulk insert above the composite threshold uses the bulk API."""
+    mock_sf_client.config['api']['composite_threshold'] = 1
     mock_bulk = MagicMock()
     mock_sf_client.sf.bulk = mock_bulk
-    mock_bulk.Account.insert.return_value = [{'success': True, 'id': '001'}]
+    mock_bulk.Account.insert.return_value = [{'success': True, 'id': '001'},
+                                             {'success': True, 'id': '002'}]
 
-    records = [{'Name': 'Test Account'}]
+    records = [{'Name': 'Test Account'}, {'Name': 'Test Account 2'}]
     results = mock_sf_client.bulk_insert('Account', records)
 
-    assert results == [{'success': True, 'id': '001'}]
+    assert len(results) == 2
     mock_bulk.Account.insert.assert_called_once_with(records)
+    mock_sf_client.sf._call_salesforce.assert_not_called()
+
+
+def test_bulk_update_success(mock_sf_client):
+    """Test bulk update sends PATCH requests in batches of 200."""
+    mock_sf_client.sf._call_salesforce.side_effect = lambda method, url, name, data: _response([
+        {'success': True, 'id': r['Id'], 'errors': []}
+        for r in json.loads(data)['records']
+    ])
+
+    records = [{'Id': f'001{i:05d}', 'Name': 'Updated'} for i in range(250)]
+    results = mock_sf_client.bulk_update('Account', records)
+
+    assert len(results) == 250
+    assert mock_sf_client.sf._call_salesforce.call_count == 2
+    assert mock_sf_client.sf._call_salesforce.call_args[0][0] == 'PATCH'
 
 
 def test_bulk_insert_error(mock_sf_client):
     """Test bulk insert error handling."""
-    mock_bulk = MagicMock()
-    mock_sf_client.sf.bulk = mock_bulk
     error = SalesforceError('Insert failed', status=400,
                             resource_name='insert', content={})
-    mock_bulk.Account.insert.side_effect = error
+    mock_sf_client.sf._call_salesforce.side_effect = error
 
     with pytest.raises(Exception) as exc_info:
         mock_sf_client.bulk_insert('Account', [{'Name': 'Test'}])
     expected_error = 'Bulk insert failed: Unknown error occurred for {url}. Response content: {content}'
     assert str(exc_info.value) == expected_error
+
+
+def test_rest_call_empty_response(mock_sf_client):
+    """Test a response without a body decodes to None."""
+    mock_sf_client.sf._call_salesforce.return_value.content = b''
+    assert mock_sf_client.rest_call('composite/sobjects?ids=001', 'DELETE') is None
+
+
+def test_composite_request(mock_sf_client):
+    """Test subrequests are sent as one Composite API call with versioned urls."""
+    mock_sf_client.sf._call_salesforce.return_value = _response({'compositeResponse': [
+        {'httpStatusCode': 201, 'referenceId': 'newCase', 'body': {'id': '500'}},
+        {'httpStatusCode': 204, 'referenceId': 'cleanup', 'body': None}
+    ]})
+
+    responses = mock_sf_client.composite_request([
+        {'method': 'POST', 'url': 'sobjects/Case', 'referenceId': 'newCase',
+         'body': {'Subject': 'Test'}},
+        {'method': 'DELETE', 'url': 'sobjects/Case/@{newCase.id}', 'referenceId': 'cleanup'}
+    ])
+
+    assert [r['httpStatusCode'] for r in responses] == [201, 204]
+    method, url = mock_sf_client.sf._call_salesforce.call_args[0]
+    assert (method, url) == ('POST', 'https://test.my.salesforce.com/services/data/v57.0/composite')
+    payload = json.loads(mock_sf_client.sf._call_salesforce.call_args[1]['data'])
+    assert payload['allOrNone'] is False
+    assert [r['url'] for r in payload['compositeRequest']] == [
+        '/services/data/v57.0/sobjects/Case',
+        '/services/data/v57.0/sobjects/Case/@{newCase.id}'
+    ]
+
+
+def test_get_object_fields_cached(mock_sf_client):
+    """Test describe results are served from the in-memory cache."""
+    mock_sf_client.sf.Account.describe.return_value = {'name': 'Account'}
+
+    assert mock_sf_client.get_object_fields('Account') == {'name': 'Account'}
+    assert mock_sf_client.get_object_fields('Account') == {'name': 'Account'}
+    mock_sf_client.sf.Account.describe.assert_called_once()
+
+
+def test_get_object_fields_disk_cache_stale(mock_sf_client, tmp_path):
+    """Test stale on-disk describe results are returned while refreshing."""
+    mock_sf_client.config['api']['describe_cache_dir'] = str(tmp_path)
+    mock_sf_client.config['api']['describe_cache_ttl'] = 0
+    mock_sf_client.sf.sf_instance = 'example.my.salesforce.com'
+    cache_file = tmp_path / 'example.my.salesforce.com' / 'Account.json'
+    cache_file.parent.mkdir()
+    cache_file.write_text(json.dumps({'name': 'Account', 'fields': []}))
+    mock_sf_client.sf.Account.describe.return_value = {'name': 'Account', 'fields': ['Name']}
+
+    assert mock_sf_client.get_object_fields('Account') == {'name': 'Account', 'fields': []}
+
+    # The background refresh rewrites the cache file with the fresh description
+    for _ in range(50):
+        if not mock_sf_client._describe_refreshing:
+            break
+        time.sleep(0.01)
+    assert json.loads(cache_file.read_text()) == {'name': 'Account', 'fields': ['Name']}
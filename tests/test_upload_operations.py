@@ -1,158 +1,164 @@
-from src.utils import setup_logging
-from scripts.upload_data import perform_operation_in_batches
-from src.salesforce import SalesforceClient
+from src.upload_core import perform_operation_in_batches
 import os
 import sys
 import time
-import uuid
+import secrets
 import pytest
 
 # Ensure project root is in the path
 sys.path.insert(0, os.path.abspath('.'))
 
+# SOQL templates for the query helpers below
+_SOQL_BY_ID = "SELECT Id, Subject, CaseNumber FROM Case WHERE Id = '{}'"
+_SOQL_BY_IDS = "SELECT Id, Subject, CaseNumber FROM Case WHERE Id IN ({})"
+_SOQL_BY_SUBJECT = "SELECT Id, Subject FROM Case WHERE Subject = '{}'"
+_SOQL_BY_NUMBER = "SELECT Id, Subject, CaseNumber FROM Case WHERE CaseNumber = '{}'"
+
+
+def soql_quote(value):
+    """Escape a value for use inside a quoted SOQL string literal."""
+    return str(value).replace("\\", "\\\\").replace("'", "\\'")
 
 # Helper functions to query cases by ID
 
+
 def query_case_by_id(sf_client, case_id):
-    query = f"SELECT Id, Subject, CaseNumber FROM Case WHERE Id = '{case_id}'"
-    records = sf_client.query(query)
-    return records
+    return sf_client.query(_SOQL_BY_ID.format(soql_quote(case_id)))
+
+# Helper to query many cases by ID in a single query
+
+
+def query_cases_by_ids(sf_client, case_ids):
+    id_list = ", ".join(f"'{soql_quote(case_id)}'" for case_id in case_ids)
+    return {record["Id"]: record for record in sf_client.query(_SOQL_BY_IDS.format(id_list))}
+
+# Helper to wait for deleted cases to stop appearing in queries
+
+
+def wait_gone(sf_client, case_ids, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while True:
+        remaining = query_cases_by_ids(sf_client, case_ids)
+        if not remaining:
+            return
+        if time.monotonic() >= deadline:
+            raise AssertionError(f"Cases still present after {timeout}s: {list(remaining)}")
+        time.sleep(delay)
+        delay = min(delay * 2, 0.4)
 
 # Helper to query cases by subject
 
 
 def query_case_by_subject(sf_client, subject):
-    query = f"SELECT Id, Subject FROM Case WHERE Subject = '{subject}'"
-    records = sf_client.query(query)
-    return records
+    return sf_client.query(_SOQL_BY_SUBJECT.format(soql_quote(subject)))
 
 # Helper to query cases by case number
 
 
 def query_case_by_number(sf_client, case_number):
-    query = f"SELECT Id, Subject, CaseNumber FROM Case WHERE CaseNumber = '{case_number}'"
-    records = sf_client.query(query)
-    return records
+    return sf_client.query(_SOQL_BY_NUMBER.format(soql_quote(case_number)))
 
 # ----------------------------
 # Insert Operations Tests
 # ----------------------------
 
 
-def test_insert_single_record():
-    logger = setup_logging('config/config.yaml')
-    sf_client = SalesforceClient('config/config.yaml')
-    unique_id = str(uuid.uuid4())[:8]
+def test_insert_single_record(logger, sf_client):
+    unique_id = secrets.token_hex(4)
     test_subject = f"Test Case Insert Single {unique_id}"
     record = {"Subject": test_subject}
     successes, failures = perform_operation_in_batches(
         "Case", "insert", [record], sf_client, None, 200, logger)
     assert len(failures) == 0, f"Failures occurred: {failures}"
     assert len(successes) == 1
-    inserted_id = successes[0]["id"]
+    inserted_id = successes[0].id
     rec = query_case_by_id(sf_client, inserted_id)
     assert rec and rec[0]["Subject"] == test_subject
     # Cleanup: delete record
     del_successes, del_failures = perform_operation_in_batches(
         "Case", "delete", [{"Id": inserted_id}], sf_client, None, 200, logger)
     assert len(del_failures) == 0
-    time.sleep(2)
-    rec_after = query_case_by_id(sf_client, inserted_id)
-    assert rec_after == []
+    wait_gone(sf_client, [inserted_id])
 
 
-def test_insert_batch_records():
-    logger = setup_logging('config/config.yaml')
-    sf_client = SalesforceClient('config/config.yaml')
-    unique_id = str(uuid.uuid4())[:8]
+def test_insert_batch_records(logger, sf_client):
+    unique_id = secrets.token_hex(4)
     test_subject_prefix = f"Test Case Insert Batch {unique_id}"
     records = [{"Subject": f"{test_subject_prefix} {i}"} for i in range(10)]
     successes, failures = perform_operation_in_batches(
         "Case", "insert", records, sf_client, None, 200, logger)
     assert len(failures) == 0
     assert len(successes) == 10
-    inserted_ids = [s["id"] for s in successes]
+    inserted_ids = [s.id for s in successes]
+    found = query_cases_by_ids(sf_client, inserted_ids)
     for case_id in inserted_ids:
-        rec = query_case_by_id(sf_client, case_id)
-        assert rec, f"Record with id {case_id} not found"
+        assert case_id in found, f"Record with id {case_id} not found"
     # Cleanup: delete records
     delete_records = [{"Id": case_id} for case_id in inserted_ids]
     del_successes, del_failures = perform_operation_in_batches(
         "Case", "delete", delete_records, sf_client, None, 200, logger)
     assert len(del_failures) == 0
-    time.sleep(2)
-    for case_id in inserted_ids:
-        rec = query_case_by_id(sf_client, case_id)
-        assert rec == []
+    wait_gone(sf_client, inserted_ids)
 
 # ----------------------------
 # Update Operations Tests
 # ----------------------------
 
 
-def test_update_single_record():
-    logger = setup_logging('config/config.yaml')
-    sf_client = SalesforceClient('config/config.yaml')
-    unique_id = str(uuid.uuid4())[:8]
+def test_update_single_record(logger, sf_client):
+    unique_id = secrets.token_hex(4)
     original_subject = f"Test Case Update Single {unique_id}"
     record = {"Subject": original_subject}
     ins_successes, ins_failures = perform_operation_in_batches(
         "Case", "insert", [record], sf_client, None, 200, logger)
     assert len(ins_failures) == 0
-    inserted_id = ins_successes[0]["id"]
+    inserted_id = ins_successes[0].id
     updated_subject = original_subject + " Updated"
     update_record = {"Id": inserted_id, "Subject": updated_subject}
     upd_successes, upd_failures = perform_operation_in_batches(
         "Case", "update", [update_record], sf_client, None, 200, logger)
     assert len(upd_failures) == 0
-    rec = query_case_by_id(sf_client, inserted_id)
-    assert rec and rec[0]["Subject"] == updated_subject
-    # Cleanup: delete record
-    del_successes, del_failures = perform_operation_in_batches(
-        "Case", "delete", [{"Id": inserted_id}], sf_client, None, 200, logger)
-    assert len(del_failures) == 0
-    time.sleep(2)
-    rec_after = query_case_by_id(sf_client, inserted_id)
-    assert rec_after == []
-
-
-def test_update_batch_records():
-    logger = setup_logging('config/config.yaml')
-    sf_client = SalesforceClient('config/config.yaml')
-    unique_id = str(uuid.uuid4())[:8]
+    # Verify the update and clean up in a single Composite API round trip
+    case_url = f"sobjects/Case/{inserted_id}"
+    verify, cleanup = sf_client.composite_request([
+        {"method": "GET", "url": case_url, "referenceId": "verify"},
+        {"method": "DELETE", "url": case_url, "referenceId": "cleanup"}
+    ])
+    assert verify["body"]["Subject"] == updated_subject
+    assert cleanup["httpStatusCode"] == 204
+
+
+def test_update_batch_records(logger, sf_client):
+    unique_id = secrets.token_hex(4)
     test_subject_prefix = f"Test Case Update Batch {unique_id}"
     records = [{"Subject": f"{test_subject_prefix} {i}"} for i in range(10)]
     ins_successes, ins_failures = perform_operation_in_batches(
         "Case", "insert", records, sf_client, None, 200, logger)
     assert len(ins_failures) == 0
-    inserted_ids = [s["id"] for s in ins_successes]
+    inserted_ids = [s.id for s in ins_successes]
     update_records = [{"Id": case_id, "Subject": f"{test_subject_prefix} {i} Updated"}
                       for i, case_id in enumerate(inserted_ids)]
     upd_successes, upd_failures = perform_operation_in_batches(
         "Case", "update", update_records, sf_client, None, 200, logger)
     assert len(upd_failures) == 0
+    found = query_cases_by_ids(sf_client, inserted_ids)
     for i, case_id in enumerate(inserted_ids):
-        rec = query_case_by_id(sf_client, case_id)
         expected_subject = f"{test_subject_prefix} {i} Updated"
-        assert rec and rec[0]["Subject"] == expected_subject
+        assert found[case_id]["Subject"] == expected_subject
     delete_records = [{"Id": case_id} for case_id in inserted_ids]
     del_successes, del_failures = perform_operation_in_batches(
         "Case", "delete", delete_records, sf_client, None, 200, logger)
     assert len(del_failures) == 0
-    time.sleep(2)
-    for case_id in inserted_ids:
-        rec = query_case_by_id(sf_client, case_id)
-        assert rec == []
+    wait_gone(sf_client, inserted_ids)
 
 # ----------------------------
 # Upsert Operations Tests
 # ----------------------------
 
 
-def test_upsert_single_record():
-    logger = setup_logging('config/config.yaml')
-    sf_client = SalesforceClient('config/config.yaml')
-    unique_id = str(uuid.uuid4())[:8]
+def test_upsert_single_record(logger, sf_client):
+    unique_id = secrets.token_hex(4)
     original_subject = f"Test Case Upsert Single {unique_id}"
 
     # First, create a record to get a CaseNumber
@@ -160,7 +166,7 @@ def test_upsert_single_record():
     insert_successes, insert_failures = perform_operation_in_batches(
         "Case", "insert", [record], sf_client, None, 200, logger)
     assert len(insert_failures) == 0
-    inserted_id = insert_successes[0]["id"]
+    inserted_id = insert_successes[0].id
 
     # Get the CaseNumber
     rec = query_case_by_id(sf_client, inserted_id)
@@ -182,15 +188,11 @@ def test_upsert_single_record():
     del_successes, del_failures = perform_operation_in_batches(
         "Case", "delete", [{"Id": inserted_id}], sf_client, None, 200, logger)
     assert len(del_failures) == 0
-    time.sleep(2)
-    rec_after = query_case_by_id(sf_client, inserted_id)
-    assert rec_after == []
+    wait_gone(sf_client, [inserted_id])
 
 
-def test_upsert_batch_records():
-    logger = setup_logging('config/config.yaml')
-    sf_client = SalesforceClient('config/config.yaml')
-    unique_id = str(uuid.uuid4())[:8]
+def test_upsert_batch_records(logger, sf_client):
+    unique_id = secrets.token_hex(4)
     test_subject_prefix = f"Test Case Upsert Batch {unique_id}"
 
     # First, create records to get CaseNumbers
@@ -198,14 +200,11 @@ def test_upsert_batch_records():
     insert_successes, insert_failures = perform_operation_in_batches(
         "Case", "insert", records, sf_client, None, 200, logger)
     assert len(insert_failures) == 0
-    inserted_ids = [s["id"] for s in insert_successes]
+    inserted_ids = [s.id for s in insert_successes]
 
     # Get all CaseNumbers
-    case_numbers = []
-    for case_id in inserted_ids:
-        rec = query_case_by_id(sf_client, case_id)
-        assert rec
-        case_numbers.append(rec[0]["CaseNumber"])
+    found = query_cases_by_ids(sf_client, inserted_ids)
+    case_numbers = [found[case_id]["CaseNumber"] for case_id in inserted_ids]
 
     # Now try to upsert using CaseNumbers
     upsert_records = []
@@ -221,59 +220,47 @@ def test_upsert_batch_records():
     assert len(upsert_failures) == 0
 
     # Verify the updates
-    for i, case_number in enumerate(case_numbers):
-        rec = query_case_by_number(sf_client, case_number)
+    found = query_cases_by_ids(sf_client, inserted_ids)
+    for i, case_id in enumerate(inserted_ids):
         expected_subject = f"{test_subject_prefix} {i} Updated"
-        assert rec and rec[0]["Subject"] == expected_subject
+        assert found[case_id]["Subject"] == expected_subject
 
     # Cleanup
     delete_records = [{"Id": case_id} for case_id in inserted_ids]
     del_successes, del_failures = perform_operation_in_batches(
         "Case", "delete", delete_records, sf_client, None, 200, logger)
     assert len(del_failures) == 0
-    time.sleep(2)
-    for case_id in inserted_ids:
-        rec = query_case_by_id(sf_client, case_id)
-        assert rec == []
+    wait_gone(sf_client, inserted_ids)
 
 # ----------------------------
 # Delete Operations Tests
 # ----------------------------
 
 
-def test_delete_single_record():
-    logger = setup_logging('config/config.yaml')
-    sf_client = SalesforceClient('config/config.yaml')
-    unique_id = str(uuid.uuid4())[:8]
+def test_delete_single_record(logger, sf_client):
+    unique_id = secrets.token_hex(4)
     test_subject = f"Test Case Delete Single {unique_id}"
     record = {"Subject": test_subject}
     ins_successes, ins_failures = perform_operation_in_batches(
         "Case", "insert", [record], sf_client, None, 200, logger)
     assert len(ins_failures) == 0
-    inserted_id = ins_successes[0]["id"]
+    inserted_id = ins_successes[0].id
     del_successes, del_failures = perform_operation_in_batches(
         "Case", "delete", [{"Id": inserted_id}], sf_client, None, 200, logger)
     assert len(del_failures) == 0
-    time.sleep(2)
-    rec_after = query_case_by_id(sf_client, inserted_id)
-    assert rec_after == []
+    wait_gone(sf_client, [inserted_id])
 
 
-def test_delete_batch_records():
-    logger = setup_logging('config/config.yaml')
-    sf_client = SalesforceClient('config/config.yaml')
-    unique_id = str(uuid.uuid4())[:8]
+def test_delete_batch_records(logger, sf_client):
+    unique_id = secrets.token_hex(4)
     test_subject_prefix = f"Test Case Delete Batch {unique_id}"
     records = [{"Subject": f"{test_subject_prefix} {i}"} for i in range(10)]
     ins_successes, ins_failures = perform_operation_in_batches(
         "Case", "insert", records, sf_client, None, 200, logger)
     assert len(ins_failures) == 0
-    inserted_ids = [s["id"] for s in ins_successes]
+    inserted_ids = [s.id for s in ins_successes]
     delete_records = [{"Id": case_id} for case_id in inserted_ids]
     del_successes, del_failures = perform_operation_in_batches(
         "Case", "delete", delete_records, sf_client, None, 200, logger)
     assert len(del_failures) == 0
-    time.sleep(2)
-    for case_id in inserted_ids:
-        rec = query_case_by_id(sf_client, case_id)
-        assert rec == []
+    wait_gone(sf_client, inserted_ids)
@@ -0,0 +1,123 @@
+"""
+Unit tests for utility functions.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import pytest
+import yaml
+from src.utils import build_sobject_collection_payload, load_config, read_csv, setup_logging
+
+
+@pytest.fixture
+def csv_config(tmp_path):
+    """Fixture for a config file that always uses the pyarrow CSV reader."""
+    with open('config/config.yaml') as f:
+        config = yaml.safe_load(f)
+    config['csv']['arrow_threshold'] = 0
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text(yaml.safe_dump(config))
+    return str(config_path)
+
+
+def test_read_csv_arrow_matches_dictreader(csv_config, tmp_path):
+    """Test the pyarrow reader yields the same rows as csv.DictReader."""
+    pytest.importorskip('pyarrow')
+    csv_file = tmp_path / 'input.csv'
+    csv_file.write_text('Name,Phone,Notes\nAcme,0123,"multi\nline"\nBeta,,\n')
+
+    rows = list(read_csv(str(csv_file), csv_config))
+
+    assert rows == list(read_csv(str(csv_file)))
+    assert rows == [
+        {'Name': 'Acme', 'Phone': '0123', 'Notes': 'multi\nline'},
+        {'Name': 'Beta', 'Phone': '', 'Notes': ''}
+    ]
+
+
+def test_load_config_cached_per_path_and_mtime(tmp_path, monkeypatch):
+    """Test one parsed config is shared until the file changes."""
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text('api:\n  version: "57.0"\n')
+    monkeypatch.chdir(tmp_path)
+
+    first = load_config(str(config_path))
+    assert load_config('config.yaml') is first
+
+    config_path.write_text('api:\n  version: "58.0"\n')
+    os.utime(config_path, (0, os.path.getmtime(config_path) + 10))
+    assert load_config(str(config_path))['api']['version'] == '58.0'
+
+
+@pytest.fixture
+def log_config(tmp_path):
+    """Fixture for a config file that logs into a temporary directory."""
+    with open('config/config.yaml') as f:
+        config = yaml.safe_load(f)
+    config['logging']['file'] = str(tmp_path / 'logs' / 'app.log')
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text(yaml.safe_dump(config))
+    return config
+
+
+@pytest.fixture
+def root_logger():
+    """Fixture for the root logger, restoring its handlers and level afterwards."""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    setup_logging.cache_clear()
+    yield root
+    root.handlers = saved_handlers
+    root.setLevel(saved_level)
+    setup_logging.cache_clear()
+
+
+def test_setup_logging_writes_through_queue_listener(log_config, root_logger, tmp_path):
+    """Test records reach the log file via the queue listener without duplicate handlers."""
+    config_path = str(tmp_path / 'config.yaml')
+    # Drop pytest's capture handlers so setup_logging configures the root logger
+    root_logger.handlers = []
+    logger = setup_logging(config_path)
+
+    queue_handlers = root_logger.handlers
+    assert len(queue_handlers) == 1
+    assert isinstance(queue_handlers[0], logging.handlers.QueueHandler)
+
+    # A repeat call, cached or not, leaves the existing handler in place
+    assert setup_logging(config_path) is logger
+    setup_logging.cache_clear()
+    setup_logging(config_path)
+    assert root_logger.handlers == queue_handlers
+
+    # Neither the log file nor its directory exists until something is logged
+    assert not (tmp_path / 'logs').exists()
+    logger.warning("queued message")
+    # Stopping the listener drains the queue into the file handler
+    listener = queue_handlers[0].listener
+    listener.stop()
+    atexit.unregister(listener.stop)
+    for target in listener.handlers:
+        target.close()
+    with open(log_config['logging']['file']) as f:
+        assert f.read().count("queued message") == 1
+
+
+def test_build_payload_hoists_operation_to_request():
+    """Test the operation selects the endpoint and method instead of per-record attributes."""
+    endpoint, method, payload = build_sobject_collection_payload(
+        [{'Ext__c': 'A1', 'Name': 'Acme'}], 'Account', 'upsert', 'Ext__c')
+
+    assert (endpoint, method) == ('composite/sobjects/Account/Ext__c', 'PATCH')
+    assert payload == {'allOrNone': False, 'records': [
+        {'attributes': {'type': 'Account'}, 'Ext__c': 'A1', 'Name': 'Acme'}]}
+
+
+def test_build_payload_delete_uses_ids_only():
+    """Test delete puts the Ids in the URL and sends no body."""
+    endpoint, method, payload = build_sobject_collection_payload(
+        [{'Id': '001A'}, {'Id': '001B'}], 'Account', 'delete')
+
+    assert (endpoint, method, payload) == ('composite/sobjects?ids=001A,001B&allOrNone=false', 'DELETE', None)
+    with pytest.raises(ValueError):
+        build_sobject_collection_payload([{'Id': '001A'}, {'Name': 'x'}], 'Account', 'delete')